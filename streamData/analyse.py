@@ -0,0 +1,205 @@
+import pandas as pd
+
+from normalisation import COLONNES_PRIX, COLONNES_SURFACE
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from stockage import a_jour, chemin_colonnaire, convertir, lire_dataframe
+
+# duckdb et polars sont optionnels: sans eux les requêtes sont faites avec pandas
+# sur les seules colonnes nécessaires
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+FONCTIONS = ["médiane", "moyenne", "min", "max", "somme", "nombre"]
+
+
+# colonnes calculées: nom -> (numérateur, dénominateur), le quotient est nul si le dénominateur vaut 0
+def colonnes_derivees(noms):
+    """Colonnes dérivées disponibles pour un fichier, d'après les noms de ses colonnes."""
+    derivees = {}
+    prix = next((nom for nom in noms if str(nom).lower() in COLONNES_PRIX), None)
+    surface = next((nom for nom in noms if str(nom).lower() in COLONNES_SURFACE), None)
+    if prix and surface:
+        derivees["prix_m2"] = (prix, surface)
+    return derivees
+
+
+# description déclarative d'une requête: colonnes affichées, ou agrégats par groupe
+class Requete:
+    def __init__(self, colonnes=(), groupes=(), agregats=(), derivees=None, tri=None, decroissant=True, limite=None):
+        self.colonnes = list(colonnes)
+        self.groupes = list(groupes)
+        self.agregats = list(agregats)
+        self.derivees = derivees or {}
+        self.tri = tri
+        self.decroissant = decroissant
+        self.limite = limite
+
+    # deux requêtes identiques ont la même clé dans le cache des résultats
+    def _champs(self):
+        return (tuple(self.colonnes), tuple(self.groupes), tuple(self.agregats),
+                tuple(sorted(self.derivees.items())), self.tri, self.decroissant, self.limite)
+
+    def __eq__(self, autre):
+        return isinstance(autre, Requete) and self._champs() == autre._champs()
+
+    def __hash__(self):
+        return hash(self._champs())
+
+    def nom_agregat(self, colonne, fonction):
+        return f"{fonction} {colonne}"
+
+    def sources(self):
+        """Colonnes réellement lues dans le fichier (les dérivées sont remplacées par leurs opérandes)."""
+        noms = self.colonnes + self.groupes + [colonne for colonne, _ in self.agregats]
+        lues = []
+        for nom in noms:
+            for source in self.derivees.get(nom, (nom,)):
+                if source not in lues:
+                    lues.append(source)
+        return lues
+
+    def cle_tri(self):
+        if self.tri is None and self.agregats:
+            return self.nom_agregat(*self.agregats[0])
+        return self.tri
+
+
+# les moteurs exposent la même interface: exécuter une requête sur la copie parquet
+# d'un fichier; le filtrage des colonnes et l'agrégation sont faits par le moteur
+class MoteurDuckDB:
+    nom = "duckdb"
+    FONCTIONS = {"médiane": "median", "moyenne": "avg", "min": "min", "max": "max", "somme": "sum", "nombre": "count"}
+
+    def _identifiant(self, nom):
+        return '"' + str(nom).replace('"', '""') + '"'
+
+    def _expression(self, requete, nom):
+        if nom in requete.derivees:
+            numerateur, denominateur = map(self._identifiant, requete.derivees[nom])
+            return f"CAST({numerateur} AS DOUBLE) / NULLIF({denominateur}, 0)"
+        return self._identifiant(nom)
+
+    def executer(self, copie, requete):
+        q = self._identifiant
+        if requete.agregats:
+            selection = [q(groupe) for groupe in requete.groupes] + [
+                f"{self.FONCTIONS[fonction]}({self._expression(requete, colonne)}) AS {q(requete.nom_agregat(colonne, fonction))}"
+                for colonne, fonction in requete.agregats
+            ]
+        else:
+            selection = [f"{self._expression(requete, nom)} AS {q(nom)}" for nom in requete.colonnes]
+        sql = f"SELECT {', '.join(selection)} FROM read_parquet(?)"
+        if requete.agregats and requete.groupes:
+            sql += " GROUP BY " + ", ".join(q(groupe) for groupe in requete.groupes)
+        if requete.cle_tri():
+            sql += f" ORDER BY {q(requete.cle_tri())} {'DESC' if requete.decroissant else 'ASC'} NULLS LAST"
+        if requete.limite:
+            sql += f" LIMIT {int(requete.limite)}"
+        with duckdb.connect() as conn:
+            return conn.execute(sql, [copie]).df()
+
+
+class MoteurPolars:
+    nom = "polars"
+
+    def _expression(self, requete, nom):
+        if nom in requete.derivees:
+            numerateur, denominateur = requete.derivees[nom]
+            diviseur = pl.when(pl.col(denominateur) != 0).then(pl.col(denominateur))
+            return (pl.col(numerateur).cast(pl.Float64) / diviseur).alias(nom)
+        return pl.col(nom)
+
+    def _agregat(self, requete, colonne, fonction):
+        expression = self._expression(requete, colonne)
+        expression = {
+            "médiane": expression.median, "moyenne": expression.mean, "min": expression.min,
+            "max": expression.max, "somme": expression.sum, "nombre": expression.count,
+        }[fonction]()
+        return expression.alias(requete.nom_agregat(colonne, fonction))
+
+    def executer(self, copie, requete):
+        lazy = pl.scan_parquet(copie)
+        if requete.agregats:
+            agregats = [self._agregat(requete, colonne, fonction) for colonne, fonction in requete.agregats]
+            lazy = lazy.group_by(requete.groupes).agg(agregats) if requete.groupes else lazy.select(agregats)
+        else:
+            lazy = lazy.select([self._expression(requete, nom) for nom in requete.colonnes])
+        if requete.cle_tri():
+            lazy = lazy.sort(requete.cle_tri(), descending=requete.decroissant, nulls_last=True)
+        if requete.limite:
+            lazy = lazy.limit(requete.limite)
+        return lazy.collect().to_pandas()
+
+
+class MoteurPandas:
+    nom = "pandas"
+    FONCTIONS = {"médiane": "median", "moyenne": "mean", "min": "min", "max": "max", "somme": "sum", "nombre": "count"}
+
+    def executer(self, chemin, requete):
+        # seules les colonnes utiles sont lues depuis la copie parquet
+        df = lire_dataframe(chemin, colonnes=requete.sources())
+        for nom, (numerateur, denominateur) in requete.derivees.items():
+            if nom in requete.colonnes or any(colonne == nom for colonne, _ in requete.agregats):
+                diviseur = pd.to_numeric(df[denominateur], errors="coerce").astype("float64")
+                df[nom] = pd.to_numeric(df[numerateur], errors="coerce").astype("float64") / diviseur.where(diviseur != 0)
+        if requete.agregats:
+            colonnes = {requete.nom_agregat(c, f): pd.NamedAgg(c, self.FONCTIONS[f]) for c, f in requete.agregats}
+            if requete.groupes:
+                df = df.groupby(requete.groupes, observed=True, dropna=False).agg(**colonnes).reset_index()
+            else:
+                df = pd.DataFrame({nom: [df[agregat.column].agg(agregat.aggfunc)] for nom, agregat in colonnes.items()})
+        else:
+            df = df[requete.colonnes]
+        if requete.cle_tri():
+            df = df.sort_values(requete.cle_tri(), ascending=not requete.decroissant, na_position="last")
+        if requete.limite:
+            df = df.head(requete.limite)
+        return df.reset_index(drop=True)
+
+
+MOTEURS = {"pandas": MoteurPandas}
+if pl is not None:
+    MOTEURS["polars"] = MoteurPolars
+if duckdb is not None:
+    MOTEURS["duckdb"] = MoteurDuckDB
+
+MOTEUR_PAR_DEFAUT = "duckdb" if "duckdb" in MOTEURS else "polars" if "polars" in MOTEURS else "pandas"
+
+
+def _copie_parquet(chemin):
+    """Chemin de la copie parquet à jour, ou None si le fichier ne peut pas être converti."""
+    if not a_jour(chemin):
+        try:
+            convertir(chemin)
+        except Exception:
+            return None
+    return chemin_colonnaire(chemin)
+
+
+def colonnes_numeriques(chemin):
+    """Noms des colonnes numériques du fichier typé, lus dans le schéma parquet sans lire les données."""
+    copie = _copie_parquet(chemin)
+    if copie is None:
+        df = lire_dataframe(chemin)
+        return [nom for nom in df.columns if pd.api.types.is_numeric_dtype(df[nom])]
+    schema = pq.read_schema(copie)
+    return [champ.name for champ in schema if pa.types.is_integer(champ.type) or pa.types.is_floating(champ.type)]
+
+
+def executer(chemin, requete, moteur=None):
+    """Exécute une requête sur un fichier de la bibliothèque avec le moteur le plus rapide disponible."""
+    moteur = MOTEURS[moteur or MOTEUR_PAR_DEFAUT]()
+    copie = None if moteur.nom == "pandas" else _copie_parquet(chemin)
+    if copie is None:
+        # sans copie parquet, seul pandas sait relire la source
+        return MoteurPandas().executer(chemin, requete)
+    return moteur.executer(copie, requete)
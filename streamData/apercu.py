@@ -0,0 +1,78 @@
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from stockage import a_jour, chemin_colonnaire, convertir
+
+OPERATEURS = ["=", "!=", ">", ">=", "<", "<=", "contient"]
+
+
+def _colonne(table, nom):
+    colonne = table.column(nom)
+    # les colonnes catégorielles sont stockées en dictionnaire: on compare sur les valeurs
+    if pa.types.is_dictionary(colonne.type):
+        colonne = pc.cast(colonne, colonne.type.value_type)
+    return colonne
+
+
+def _masque(table, filtres):
+    masque = None
+    for nom, operateur, valeur in filtres:
+        colonne = _colonne(table, nom)
+        if operateur == "contient":
+            condition = pc.match_substring(pc.cast(colonne, pa.string()), str(valeur), ignore_case=True)
+        else:
+            if pa.types.is_integer(colonne.type) or pa.types.is_floating(colonne.type):
+                valeur = float(valeur)
+            fonction = {"=": pc.equal, "!=": pc.not_equal, ">": pc.greater, ">=": pc.greater_equal,
+                        "<": pc.less, "<=": pc.less_equal}[operateur]
+            condition = fonction(colonne, valeur)
+        condition = pc.fill_null(condition, False)
+        masque = condition if masque is None else pc.and_(masque, condition)
+    return masque
+
+
+def _fenetre_groupes(fichier, debut, nombre):
+    """Lit uniquement les groupes de lignes parquet qui couvrent la fenêtre demandée."""
+    groupes, position, premier = [], 0, None
+    for i in range(fichier.metadata.num_row_groups):
+        taille = fichier.metadata.row_group(i).num_rows
+        if position + taille > debut and position < debut + nombre:
+            groupes.append(i)
+            premier = position if premier is None else premier
+        position += taille
+    if not groupes:
+        return fichier.schema_arrow.empty_table()
+    return fichier.read_row_groups(groupes).slice(debut - premier, nombre)
+
+
+def lire_page(chemin, debut=0, nombre=100, tri=None, decroissant=False, filtres=()):
+    """Renvoie (page, total) pour une fenêtre de lignes d'un fichier de la bibliothèque.
+
+    Le tri et les filtres ne lisent que les colonnes concernées, puis seules les
+    lignes de la page sont extraites du fichier parquet.
+    """
+    if not a_jour(chemin):
+        convertir(chemin)
+    copie = chemin_colonnaire(chemin)
+
+    if not tri and not filtres:
+        fichier = pq.ParquetFile(copie, memory_map=True)
+        return _fenetre_groupes(fichier, debut, nombre).to_pandas(), fichier.metadata.num_rows
+
+    jeu = ds.dataset(copie, format="parquet")
+    colonnes = sorted({nom for nom, _, _ in filtres} | ({tri} if tri else set()))
+    table = jeu.to_table(columns=colonnes)
+
+    indices = np.arange(table.num_rows)
+    if filtres:
+        indices = np.flatnonzero(_masque(table, filtres).to_numpy(zero_copy_only=False))
+    if tri:
+        cle = _colonne(table, tri).take(pa.array(indices))
+        ordre = pc.sort_indices(cle, sort_keys=[("", "descending" if decroissant else "ascending")])
+        indices = indices[ordre.to_numpy()]
+
+    fenetre = indices[debut:debut + nombre]
+    return jeu.take(pa.array(fenetre)).to_pandas(), len(indices)
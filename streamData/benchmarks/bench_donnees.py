@@ -0,0 +1,146 @@
+# benchmark du chemin Visualisation sur des jeux synthétiques de 10k, 1M et 10M lignes:
+# conversion (csv -> parquet typé), lecture, profil, agrégats des graphes, tracé et requête
+# chaque taille tourne dans un processus neuf; les données sont générées dans un dossier temporaire
+# usage: python benchmarks/bench_donnees.py [--tailles 10000,1000000] [--comparer resultats/donnees-....json]
+import argparse
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+DOSSIER = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(DOSSIER))
+
+import numpy as np
+import pandas as pd
+
+from commun import comparer, enregistrer, executer_isole, rss_max_mo
+
+TAILLES = (10_000, 1_000_000, 10_000_000)
+# le csv est écrit par morceaux: la génération de 10M lignes ne tient pas tout en mémoire
+TAILLE_MORCEAU = 500_000
+# part des lignes au prix illisible, qui partent en quarantaine à la conversion
+PART_INVALIDES = 0.005
+
+QUARTIERS = [f"Quartier {i}" for i in range(300)]
+VILLES = ["Dakar", "Thiès", "Mbour", "Saint-Louis", "Ziguinchor", "Kaolack", "Touba", "Rufisque"]
+
+
+def generer_morceau(rng, debut, n):
+    prix = rng.lognormal(17.5, 0.6, n).round(-5).astype("int64")
+    surfaces = rng.integers(100, 2_000, n)
+    villes = rng.choice(VILLES, n)
+    df = pd.DataFrame({
+        "type annonce": rng.choice(["Vente", "Location"], n, p=[0.8, 0.2]),
+        "nombre pieces": rng.integers(1, 12, n),
+        "prix": prix.astype(str),
+        "superficie": pd.Series(surfaces).astype(str) + " m2",
+        "adresse": pd.Series(rng.choice(QUARTIERS, n)) + ", " + villes + ", Sénégal",
+        "image lien": [f"https://images.coinafrique.com/{debut + i}.jpg" for i in range(n)],
+        "id annonce": np.arange(debut, debut + n) + 1_000_000,
+    })
+    invalides = rng.random(n) < PART_INVALIDES
+    df.loc[invalides, "prix"] = "à débattre"
+    return df
+
+
+def generer(chemin, lignes, graine=0):
+    rng = np.random.default_rng(graine)
+    for debut in range(0, lignes, TAILLE_MORCEAU):
+        morceau = generer_morceau(rng, debut, min(TAILLE_MORCEAU, lignes - debut))
+        morceau.to_csv(chemin, mode="a" if debut else "w", header=not debut, index=False)
+
+
+def executer_taille(args):
+    """Exécuté dans le processus isolé: chaque étape est chronométrée, le pic de mémoire relevé après chacune."""
+    import json
+
+    # les copies parquet (.cache/colonnaire) sont écrites à côté des données générées
+    os.chdir(args.dossier)
+    from analyse import Requete, executer
+    from graphes import agreger
+    from profilage import profiler
+    from stockage import convertir, lire_dataframe
+
+    chemin = os.path.join(args.dossier, f"donnees-{args.taille}.csv")
+    resultat = {"cas": f"{args.taille} lignes", "lignes": args.taille, "octets_csv": os.path.getsize(chemin)}
+
+    def etape(nom, fonction):
+        debut = time.perf_counter()
+        valeur = fonction()
+        resultat[f"{nom}_s"] = round(time.perf_counter() - debut, 3)
+        resultat[f"{nom}_rss_max_mo"] = rss_max_mo()
+        return valeur
+
+    etape("conversion", lambda: convertir(chemin))
+    df = etape("lecture", lambda: lire_dataframe(chemin))
+    resultat["lignes_propres"] = len(df)
+    del df
+    etape("profil", lambda: profiler(chemin))
+    agregats = etape("agregats", lambda: (agreger(chemin, "prix"), agreger(chemin, "adresse")))
+
+    # matplotlib est une dépendance de l'appli, mais peut manquer sur une machine de mesure
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        plt = None
+    if plt is not None:
+        from graphes import tracer_barres, tracer_histogramme
+
+        def tracer():
+            for agregat, tracer_agregat in zip(agregats, (tracer_histogramme, tracer_barres)):
+                fig, ax = plt.subplots()
+                tracer_agregat(agregat, ax)
+                fig.savefig(io.BytesIO(), format="png")
+                plt.close(fig)
+
+        etape("trace", tracer)
+
+    requete = Requete(groupes=["region"], agregats=[("prix", "médiane"), ("prix", "nombre")])
+    etape("requete", lambda: executer(chemin, requete))
+    print(json.dumps(resultat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark conversion / profil / graphes sur données synthétiques")
+    parser.add_argument("--tailles", default=",".join(map(str, TAILLES)), help="nombres de lignes, séparés par des virgules")
+    parser.add_argument("--dossier", default=None, help="dossier des données générées (temporaire par défaut)")
+    parser.add_argument("--sortie", default=None, help="fichier JSON des résultats")
+    parser.add_argument("--comparer", default=None, help="résultats de référence (JSON)")
+    parser.add_argument("--seuil", type=float, default=0.10, help="écart signalé comme régression")
+    parser.add_argument("--taille", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.taille:
+        executer_taille(args)
+        return
+
+    dossier = args.dossier or tempfile.mkdtemp(prefix="streamdata-bench-")
+    os.makedirs(dossier, exist_ok=True)
+    resultats = []
+    try:
+        for taille in (int(valeur) for valeur in args.tailles.split(",")):
+            chemin = os.path.join(dossier, f"donnees-{taille}.csv")
+            if not os.path.exists(chemin):
+                debut = time.perf_counter()
+                generer(chemin, taille)
+                print(f"{taille} lignes générées en {time.perf_counter() - debut:.1f} s")
+            resultat = executer_isole(os.path.abspath(__file__), ["--taille", str(taille), "--dossier", dossier])
+            resultats.append(resultat)
+            etapes = "  ".join(f"{nom[:-2]} {valeur:.2f} s" for nom, valeur in resultat.items() if nom.endswith("_s"))
+            print(f"{resultat['cas']:<16}{etapes}  pic {resultat['requete_rss_max_mo']} Mo")
+    finally:
+        if args.dossier is None:
+            shutil.rmtree(dossier, ignore_errors=True)
+
+    print(f"résultats: {enregistrer('donnees', resultats, args.sortie, {'tailles': args.tailles})}")
+    if args.comparer and comparer(resultats, args.comparer, args.seuil):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# micro-benchmark de l'extraction sur les pages html enregistrées dans fixtures/
+# compare l'ancien parcours BeautifulSoup (find/find_all) aux extracteurs compilés
+# usage: python benchmarks/bench_extraction.py [--repetitions 200]
+import argparse
+import os
+import sys
+import time
+
+DOSSIER = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(DOSSIER))
+
+from bs4 import BeautifulSoup as bs
+
+import extraction
+
+
+def lire_fixture(nom):
+    with open(os.path.join(DOSSIER, "fixtures", nom), encoding="utf-8") as f:
+        return f.read()
+
+
+# l'ancien code de utils.py, conservé ici comme référence
+def historique_liste_terrains(html):
+    soup = bs(html, 'html.parser')
+    resultats = []
+    for container in soup.find_all("div", class_="col s6 m4 l3"):
+        try:
+            img_link = container.find("img", class_="ad__card-img")["src"]
+            prix = int(container.find("p", class_="ad__card-price").text.replace(" ", "").replace("CFA", ""))
+            adresse = container.find("p", class_="ad__card-location").text.replace("location_on", "")
+            inner_link = container.find("a", class_="card-image ad__card-image waves-block waves-light")["href"]
+        except Exception:
+            continue
+        resultats.append((img_link, prix, adresse, inner_link))
+    return resultats
+
+def historique_villa(html):
+    soup1 = bs(html, 'html.parser')
+    container_1 = soup1.find('div', class_="card round slide proffer z-depth-0 remove-background-white")
+    type_annonce = container_1.find('h1', class_='title title-ad hide-on-large-and-down').text.split()[0].capitalize()
+    nombre_pieces = int(container_1.find('span', class_='qt').text)
+    prix = int(container_1.find('p', class_='price').text.replace('CFA', '').replace(' ', '').strip())
+    adresse = container_1.find_all('span', class_='valign-wrapper')[1].text
+    return type_annonce, nombre_pieces, prix, adresse
+
+
+def mesurer(fonction, html, repetitions):
+    debut = time.perf_counter()
+    for _ in range(repetitions):
+        fonction(html)
+    duree = time.perf_counter() - debut
+    return repetitions / duree
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repetitions", type=int, default=200)
+    args = parser.parse_args()
+
+    liste = lire_fixture("liste_terrains.html")
+    annonce = lire_fixture("annonce_villa.html")
+
+    cas = [("historique (bs4 find)", historique_liste_terrains, historique_villa)]
+    for nom in extraction.BACKENDS:
+        liste_compilee = extraction.Extracteur(
+            extraction.CHAMPS_LISTE_TERRAINS, conteneur=extraction.CONTENEUR_LISTE, backend=nom)
+        villa_compilee = extraction.Extracteur(
+            extraction.CHAMPS_VILLA, conteneur=extraction.CONTENEUR_VILLA, backend=nom)
+        cas.append((f"compilé ({nom})", liste_compilee.extraire_tout, villa_compilee.extraire))
+
+    print(f"{'extraction':<24}{'listes/s':>12}{'annonces/s':>14}")
+    reference = None
+    for nom, fonction_liste, fonction_annonce in cas:
+        listes = mesurer(fonction_liste, liste, args.repetitions)
+        annonces = mesurer(fonction_annonce, annonce, args.repetitions)
+        reference = reference or annonces
+        print(f"{nom:<24}{listes:>12.1f}{annonces:>14.1f}   x{annonces / reference:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# benchmark de bout en bout de scrap_villas et scrap_terrains contre le serveur de rejeu local
+# (pages enregistrées, latence réglable); chaque cas tourne dans un processus neuf
+# mesures: annonces/s, octets/s, pic de mémoire, temps CPU total et temps CPU du parsing
+# usage: python benchmarks/bench_scraping.py [--pages 10] [--latence 50] [--comparer resultats/scraping-....json]
+import argparse
+import os
+import sys
+import time
+
+DOSSIER = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(DOSSIER))
+
+from commun import comparer, enregistrer, executer_isole, rss_max_mo, temps_cpu
+from serveur_rejeu import ServeurRejeu
+
+CAS = ("scrap_villas", "scrap_terrains")
+
+
+def executer_cas(args):
+    """Exécuté dans le processus isolé: un scraping complet, puis les mesures en JSON."""
+    import json
+
+    import utils
+    from client_http import ClientHttp
+    from mesures import mesures_globales
+
+    utils.BASE_URL = args.url
+    # pas de cache disque: chaque page est vraiment téléchargée et analysée
+    client = ClientHttp(cache=None)
+    fonction = getattr(utils, args.cas)
+    cpu, debut = temps_cpu(), time.perf_counter()
+    # sans --processus, le réglage par défaut du scraper est celui qui est mesuré
+    options = {} if args.processus is None else {"processus": args.processus}
+    df = fonction(args.pages, args.concurrence, args.requetes_par_seconde, client, **options)
+    duree = time.perf_counter() - debut
+    cpu = temps_cpu() - cpu
+
+    mesures = mesures_globales().instantane()
+    octets = sum(point["valeur"] for point in mesures["compteurs"].get("streamdata_octets_telecharges_total", []))
+    requetes = sum(point["valeur"] for point in mesures["compteurs"].get("streamdata_requetes_total", []))
+    # par défaut le parsing tourne dans le thread du crawl: sa durée est du temps CPU
+    analyse = sum(serie["somme"] for serie in mesures["histogrammes"].get("streamdata_analyse_secondes", []))
+    print(json.dumps({
+        "cas": args.cas,
+        "annonces": len(df),
+        "requetes": requetes,
+        "duree_s": round(duree, 3),
+        "annonces_par_s": round(len(df) / duree, 1),
+        "octets_par_s": round(octets / duree),
+        "rss_max_mo": rss_max_mo(),
+        "cpu_s": round(cpu, 3),
+        "cpu_analyse_s": round(analyse, 3),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du scraping sur pages rejouées")
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--latence", type=float, default=50, help="latence du serveur, en ms")
+    parser.add_argument("--gigue", type=float, default=10, help="variation de la latence, en ms")
+    parser.add_argument("--concurrence", type=int, default=8)
+    # le limiteur de débit protège le vrai site; ici on mesure le pipeline
+    parser.add_argument("--requetes-par-seconde", type=float, default=1000.0)
+    parser.add_argument("--processus", type=int, default=None, help="processus d'analyse (défaut du scraper si absent, 0: dans le thread du crawl)")
+    parser.add_argument("--sortie", default=None, help="fichier JSON des résultats")
+    parser.add_argument("--comparer", default=None, help="résultats de référence (JSON)")
+    parser.add_argument("--seuil", type=float, default=0.10, help="écart signalé comme régression")
+    parser.add_argument("--cas", choices=CAS, help=argparse.SUPPRESS)
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.cas:
+        executer_cas(args)
+        return
+
+    serveur = ServeurRejeu(latence=args.latence / 1000, gigue=args.gigue / 1000).demarrer()
+    resultats = []
+    try:
+        for cas in CAS:
+            arguments = [
+                "--cas", cas, "--url", serveur.url, "--pages", str(args.pages),
+                "--concurrence", str(args.concurrence), "--requetes-par-seconde", str(args.requetes_par_seconde),
+            ]
+            if args.processus is not None:
+                arguments += ["--processus", str(args.processus)]
+            resultat = executer_isole(os.path.abspath(__file__), arguments)
+            resultats.append(resultat)
+            print(f"{cas:<16}{resultat['annonces']:>6} annonces  {resultat['annonces_par_s']:>8.1f} annonces/s  "
+                  f"{resultat['octets_par_s'] / 1024:>8.0f} Ko/s  {resultat['rss_max_mo']} Mo  "
+                  f"cpu {resultat['cpu_s']:.2f} s (parsing {resultat['cpu_analyse_s']:.2f} s)")
+    finally:
+        serveur.arreter()
+
+    parametres = {nom: getattr(args, nom) for nom in ("pages", "latence", "gigue", "concurrence", "requetes_par_seconde", "processus")}
+    print(f"résultats: {enregistrer('scraping', resultats, args.sortie, parametres)}")
+    if args.comparer and comparer(resultats, args.comparer, args.seuil):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
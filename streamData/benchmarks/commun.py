@@ -0,0 +1,94 @@
+# outils partagés par les benchmarks: mesure de la mémoire, exécution isolée d'un cas
+# dans un processus neuf, enregistrement des résultats en JSON et comparaison à une référence
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+# resource n'existe pas sous Windows: le pic de mémoire n'est alors pas mesuré
+try:
+    import resource
+except ImportError:
+    resource = None
+
+DOSSIER = os.path.dirname(os.path.abspath(__file__))
+DOSSIER_RESULTATS = os.path.join(DOSSIER, "resultats")
+
+# métriques où une valeur plus grande est une amélioration; pour les autres (durées, mémoire) c'est l'inverse
+METRIQUES_DEBIT = ("annonces_par_s", "octets_par_s")
+
+
+def rss_max_mo():
+    """Pic de mémoire résidente du processus depuis son démarrage, en Mo."""
+    if resource is None:
+        return None
+    pic = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ko sous Linux, octets sous macOS
+    return round(pic / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def temps_cpu():
+    """Temps CPU (utilisateur + système) consommé par le processus, en secondes."""
+    debut = os.times()
+    return debut.user + debut.system
+
+
+def machine():
+    return {
+        "python": platform.python_version(),
+        "plateforme": platform.platform(),
+        "processeurs": os.cpu_count(),
+    }
+
+
+def executer_isole(script, arguments):
+    """Lance un cas dans un nouveau processus (pic de mémoire non pollué par les cas précédents)
+    et renvoie le dictionnaire JSON qu'il écrit sur sa dernière ligne de sortie."""
+    sortie = subprocess.run([sys.executable, script, *arguments], capture_output=True, text=True)
+    if sortie.returncode != 0:
+        raise RuntimeError(f"{os.path.basename(script)} {' '.join(arguments)}: {sortie.stderr.strip()[-2000:]}")
+    return json.loads(sortie.stdout.strip().splitlines()[-1])
+
+
+def enregistrer(suite, resultats, chemin=None, parametres=None):
+    """Écrit les résultats d'une suite en JSON; par défaut dans resultats/<suite>-<date>.json."""
+    if chemin is None:
+        os.makedirs(DOSSIER_RESULTATS, exist_ok=True)
+        chemin = os.path.join(DOSSIER_RESULTATS, f"{suite}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    document = {
+        "suite": suite,
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": machine(),
+        "parametres": parametres or {},
+        "resultats": resultats,
+    }
+    with open(chemin, "w", encoding="utf-8") as f:
+        json.dump(document, f, ensure_ascii=False, indent=2)
+    return chemin
+
+
+def comparer(resultats, chemin_reference, seuil=0.10):
+    """Compare aux résultats d'un fichier de référence; renvoie les lignes de régression
+    (écart défavorable de plus de `seuil`) et affiche tous les écarts."""
+    with open(chemin_reference, encoding="utf-8") as f:
+        reference = {resultat["cas"]: resultat for resultat in json.load(f)["resultats"]}
+    regressions = []
+    for resultat in resultats:
+        ancien = reference.get(resultat["cas"])
+        if ancien is None:
+            continue
+        for metrique, valeur in resultat.items():
+            precedente = ancien.get(metrique)
+            if not isinstance(valeur, (int, float)) or not isinstance(precedente, (int, float)) or not precedente:
+                continue
+            rapport = valeur / precedente
+            # rapport > 1 toujours défavorable: plus lent, plus de mémoire ou moins de débit
+            defavorable = 1 / rapport if metrique in METRIQUES_DEBIT and rapport else rapport
+            ligne = f"{resultat['cas']:<28}{metrique:<24}{precedente:>12.3f} -> {valeur:>12.3f}  x{rapport:.2f}"
+            if defavorable > 1 + seuil:
+                ligne += "  RÉGRESSION"
+                regressions.append(ligne)
+            print(ligne)
+    return regressions
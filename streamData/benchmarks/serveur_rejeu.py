@@ -0,0 +1,103 @@
+# serveur http local qui rejoue les pages coinafrique enregistrées dans fixtures/, avec une
+# latence réglable: les benchmarks de scraping ne dépendent ni du réseau ni du site
+# usage: python benchmarks/serveur_rejeu.py [--port 8765] [--latence 50] [--gigue 20]
+import argparse
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DOSSIER = os.path.dirname(os.path.abspath(__file__))
+
+PAGES_LISTE = {"villas": "liste_villas.html", "terrains": "liste_terrains.html"}
+PAGES_ANNONCE = {"villas": "annonce_villa.html", "terrains": "annonce_terrain.html"}
+
+MOTIF_LISTE = re.compile(r"^/categorie/(\w+)\?page=(\d+)$")
+MOTIF_ANNONCE = re.compile(r"^/annonce/(\w+)/")
+# identifiant en fin de lien d'annonce, dans les pages de liste
+MOTIF_LIEN = re.compile(r'(href="/annonce/\w+/[^"]*?)(\d+)"')
+
+
+def lire_fixture(nom):
+    with open(os.path.join(DOSSIER, "fixtures", nom), encoding="utf-8") as f:
+        return f.read()
+
+
+def page_liste(modele, page):
+    """La page de liste enregistrée, avec des identifiants d'annonce propres à chaque numéro
+    de page: sinon toutes les pages pointeraient vers les mêmes 40 annonces."""
+    return MOTIF_LIEN.sub(lambda m: f'{m.group(1)}{int(m.group(2)) * 10_000 + page}"', modele)
+
+
+class GestionnaireRejeu(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        serveur = self.server
+        if serveur.latence or serveur.gigue:
+            time.sleep(max(0.0, serveur.latence + random.uniform(-serveur.gigue, serveur.gigue)))
+        corps = serveur.page(self.path)
+        if corps is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(corps)))
+        self.end_headers()
+        self.wfile.write(corps)
+        with serveur.verrou:
+            serveur.requetes += 1
+            serveur.octets += len(corps)
+
+
+class ServeurRejeu(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, hote="127.0.0.1", port=0, latence=0.05, gigue=0.0):
+        super().__init__((hote, port), GestionnaireRejeu)
+        self.latence = latence
+        self.gigue = gigue
+        self.verrou = threading.Lock()
+        self.requetes = 0
+        self.octets = 0
+        self.listes = {categorie: lire_fixture(nom) for categorie, nom in PAGES_LISTE.items()}
+        self.annonces = {categorie: lire_fixture(nom).encode("utf-8") for categorie, nom in PAGES_ANNONCE.items()}
+        self.url = f"http://{hote}:{self.server_address[1]}"
+
+    def page(self, chemin):
+        liste = MOTIF_LISTE.match(chemin)
+        if liste and liste.group(1) in self.listes:
+            return page_liste(self.listes[liste.group(1)], int(liste.group(2))).encode("utf-8")
+        annonce = MOTIF_ANNONCE.match(chemin)
+        if annonce and annonce.group(1) in self.annonces:
+            return self.annonces[annonce.group(1)]
+        return None
+
+    def demarrer(self):
+        threading.Thread(target=self.serve_forever, name="rejeu", daemon=True).start()
+        return self
+
+    def arreter(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rejoue les pages coinafrique enregistrées")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latence", type=float, default=50, help="latence par requête, en ms")
+    parser.add_argument("--gigue", type=float, default=0, help="variation aléatoire de la latence, en ms")
+    args = parser.parse_args()
+    serveur = ServeurRejeu(port=args.port, latence=args.latence / 1000, gigue=args.gigue / 1000)
+    print(f"pages rejouées sur {serveur.url} (ex. {serveur.url}/categorie/villas?page=1)")
+    try:
+        serveur.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
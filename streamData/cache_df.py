@@ -0,0 +1,69 @@
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from stockage import cle_fichier, lire_dataframe
+
+# budget mémoire par défaut, modifiable avec la variable d'environnement STREAMDATA_CACHE_MO
+BUDGET_PAR_DEFAUT = int(os.environ.get("STREAMDATA_CACHE_MO", "512")) * 1024 * 1024
+
+
+def _lire(chemin, colonnes):
+    # les colonnes font partie de la clé du cache: elles y sont gardées en tuple
+    return lire_dataframe(chemin, list(colonnes) if colonnes else None)
+
+
+def _taille(resultat):
+    if isinstance(resultat, (pd.DataFrame, pd.Series)):
+        return int(resultat.memory_usage(deep=True).sum())
+    return 0
+
+
+# cache des dataframes partagé entre les sessions: les fichiers lus et les résultats calculés
+# dessus (requêtes, aperçu, quarantaine) sont gardés par version du fichier, avec éviction LRU
+# dès que la mémoire occupée dépasse le budget; les dataframes renvoyés ne doivent pas être modifiés
+class CacheDataFrames:
+    def __init__(self, budget=BUDGET_PAR_DEFAUT):
+        self.budget = budget
+        self.occupe = 0
+        self.entrees = OrderedDict()
+        self.verrou = threading.Lock()
+        self.succes = 0
+        self.echecs = 0
+
+    def charger(self, chemin, colonnes=None):
+        """lire_dataframe, mis en cache."""
+        return self.memoiser(chemin, _lire, tuple(colonnes) if colonnes else None)
+
+    def memoiser(self, chemin, fonction, *args):
+        """Renvoie fonction(chemin, *args), calculé une seule fois par version du fichier."""
+        cle = (*cle_fichier(chemin), fonction.__module__, fonction.__qualname__, args)
+        with self.verrou:
+            if cle in self.entrees:
+                self.entrees.move_to_end(cle)
+                self.succes += 1
+                return self.entrees[cle][0]
+            self.echecs += 1
+
+        resultat = fonction(chemin, *args)
+        taille = _taille(resultat)
+
+        with self.verrou:
+            # les résultats d'une ancienne version du même fichier n'ont plus de raison de rester en mémoire
+            for ancienne in [c for c in self.entrees if c[0] == cle[0] and c[1:3] != cle[1:3]]:
+                self.occupe -= self.entrees.pop(ancienne)[1]
+            if taille <= self.budget and cle not in self.entrees:
+                self.entrees[cle] = (resultat, taille)
+                self.occupe += taille
+                while self.occupe > self.budget:
+                    _, (_, liberee) = self.entrees.popitem(last=False)
+                    self.occupe -= liberee
+        return resultat
+
+    def invalider(self, chemin):
+        chemin = os.path.abspath(chemin)
+        with self.verrou:
+            for cle in [c for c in self.entrees if c[0] == chemin]:
+                self.occupe -= self.entrees.pop(cle)[1]
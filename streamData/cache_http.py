@@ -0,0 +1,111 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+DOSSIER_CACHE = ".cache"
+
+
+# cache disque des réponses HTTP: les pages sont stockées compressées et adressées
+# par leur hash (deux URL au contenu identique partagent le même blob), avec une
+# durée de validité et une éviction LRU quand la taille maximale est dépassée
+class CacheHttp:
+    def __init__(self, chemin=os.path.join(DOSSIER_CACHE, "http.sqlite"), ttl=6 * 3600,
+                 taille_max=200 * 1024 * 1024, hors_ligne=False):
+        self.ttl = ttl
+        self.taille_max = taille_max
+        self.hors_ligne = hors_ligne
+        self.verrou = threading.Lock()
+
+        dossier = os.path.dirname(chemin)
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+        self.conn = sqlite3.connect(chemin, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS blobs (
+                hash TEXT PRIMARY KEY,
+                contenu BLOB NOT NULL,
+                taille INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS reponses (
+                url TEXT PRIMARY KEY,
+                hash TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                stocke_le REAL NOT NULL,
+                utilise_le REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_reponses_utilise ON reponses (utilise_le);
+        """)
+
+    def lire(self, url, ttl=None):
+        """Renvoie l'entrée du cache pour une URL (contenu, en-têtes, fraîcheur) ou None."""
+        ttl = self.ttl if ttl is None else ttl
+        with self.verrou:
+            ligne = self.conn.execute(
+                "SELECT b.contenu, r.etag, r.last_modified, r.stocke_le FROM reponses r "
+                "JOIN blobs b ON b.hash = r.hash WHERE r.url = ?", (url,)
+            ).fetchone()
+            if ligne is None:
+                return None
+            self.conn.execute("UPDATE reponses SET utilise_le = ? WHERE url = ?", (time.time(), url))
+            self.conn.commit()
+
+        contenu, etag, last_modified, stocke_le = ligne
+        return {
+            "contenu": zlib.decompress(contenu).decode("utf-8"),
+            "etag": etag,
+            "last_modified": last_modified,
+            "frais": time.time() - stocke_le < ttl,
+        }
+
+    def ecrire(self, url, contenu, etag=None, last_modified=None):
+        """Enregistre le contenu d'une URL puis applique l'éviction si nécessaire."""
+        donnees = contenu.encode("utf-8")
+        empreinte = hashlib.sha256(donnees).hexdigest()
+        compresse = zlib.compress(donnees, 6)
+        maintenant = time.time()
+        with self.verrou:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO blobs (hash, contenu, taille) VALUES (?, ?, ?)",
+                (empreinte, compresse, len(compresse)),
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO reponses VALUES (?, ?, ?, ?, ?, ?)",
+                (url, empreinte, etag, last_modified, maintenant, maintenant),
+            )
+            self._evincer()
+            self.conn.commit()
+
+    def revalider(self, url):
+        """Marque une entrée comme fraîche après une réponse 304."""
+        maintenant = time.time()
+        with self.verrou:
+            self.conn.execute(
+                "UPDATE reponses SET stocke_le = ?, utilise_le = ? WHERE url = ?",
+                (maintenant, maintenant, url),
+            )
+            self.conn.commit()
+
+    def _evincer(self):
+        taille = self.conn.execute("SELECT COALESCE(SUM(taille), 0) FROM blobs").fetchone()[0]
+        if taille <= self.taille_max:
+            return
+        # on supprime les URL les moins récemment utilisées jusqu'à repasser sous la limite
+        for url, hash_ in self.conn.execute(
+            "SELECT url, hash FROM reponses ORDER BY utilise_le"
+        ).fetchall():
+            self.conn.execute("DELETE FROM reponses WHERE url = ?", (url,))
+            restant = self.conn.execute("SELECT 1 FROM reponses WHERE hash = ?", (hash_,)).fetchone()
+            if restant is None:
+                liberee = self.conn.execute("SELECT taille FROM blobs WHERE hash = ?", (hash_,)).fetchone()
+                self.conn.execute("DELETE FROM blobs WHERE hash = ?", (hash_,))
+                taille -= liberee[0] if liberee else 0
+            if taille <= self.taille_max:
+                break
+
+    def close(self):
+        with self.verrou:
+            self.conn.close()
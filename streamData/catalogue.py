@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from cache_http import DOSSIER_CACHE
+from profilage import profiler
+
+
+def empreinte_fichier(chemin, taille_bloc=1024 * 1024):
+    """Calcule le sha256 d'un fichier par blocs, sans le charger entièrement."""
+    h = hashlib.sha256()
+    with open(chemin, "rb") as f:
+        for bloc in iter(lambda: f.read(taille_bloc), b""):
+            h.update(bloc)
+    return h.hexdigest()
+
+
+# index des fichiers de la bibliothèque: schéma, nombre de lignes, taille, hash et
+# profil des colonnes sont calculés une fois à l'écriture puis relus sans ouvrir le fichier;
+# une entrée n'est recalculée que si la taille ou la date du fichier a changé
+class Catalogue:
+    def __init__(self, dossier, chemin=os.path.join(DOSSIER_CACHE, "catalogue.sqlite")):
+        self.dossier = dossier
+        self.verrou = threading.Lock()
+        # dernière liste renvoyée par lister(), oubliée à chaque enregistrement ou suppression
+        self.liste = None
+        self.liste_le = 0.0
+        dossier_index = os.path.dirname(chemin)
+        if dossier_index:
+            os.makedirs(dossier_index, exist_ok=True)
+        self.conn = sqlite3.connect(chemin, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS fichiers (
+                nom TEXT PRIMARY KEY,
+                taille INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                hash TEXT NOT NULL,
+                lignes INTEGER,
+                colonnes TEXT,
+                stats TEXT,
+                erreur TEXT,
+                indexe_le REAL NOT NULL,
+                quarantaine INTEGER
+            )
+        """)
+        if "quarantaine" not in [colonne[1] for colonne in self.conn.execute("PRAGMA table_info(fichiers)")]:
+            self.conn.execute("ALTER TABLE fichiers ADD COLUMN quarantaine INTEGER")
+        self.conn.commit()
+
+    def enregistrer(self, nom):
+        """(Ré)indexe un fichier de la bibliothèque, à appeler après chaque écriture."""
+        chemin = os.path.join(self.dossier, nom)
+        infos = os.stat(chemin)
+        lignes = colonnes = stats = erreur = quarantaine = None
+        try:
+            # profil de la copie normalisée (celle des graphes), calculé par morceaux sans
+            # l'écrire: la conversion n'est faite qu'à la première lecture du fichier
+            try:
+                profil = profiler(chemin, normalise=True)
+            except Exception:
+                # fichier que l'on ne sait pas normaliser: le profil est fait sur la source
+                profil = profiler(chemin)
+            lignes = profil["lignes"]
+            quarantaine = profil.get("quarantaine")
+            colonnes = json.dumps([[nom_colonne, infos_colonne["type"]] for nom_colonne, infos_colonne in profil["colonnes"].items()])
+            stats = json.dumps(profil["colonnes"])
+        except Exception as e:
+            # fichier illisible: on l'indexe quand même pour ne pas réessayer à chaque rendu
+            erreur = str(e)
+        with self.verrou:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO fichiers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (nom, infos.st_size, infos.st_mtime, empreinte_fichier(chemin),
+                 lignes, colonnes, stats, erreur, time.time(), quarantaine),
+            )
+            self.conn.commit()
+            self.liste = None
+
+    def oublier(self, nom):
+        with self.verrou:
+            self.conn.execute("DELETE FROM fichiers WHERE nom = ?", (nom,))
+            self.conn.commit()
+            self.liste = None
+
+    def _entrees(self):
+        with self.verrou:
+            lignes = self.conn.execute("SELECT * FROM fichiers").fetchall()
+        return {ligne[0]: ligne for ligne in lignes}
+
+    def lister(self, fraicheur=0):
+        """Liste la bibliothèque à partir du catalogue, en ne réindexant que les fichiers modifiés.
+
+        Avec `fraicheur` (en secondes), la liste précédente est renvoyée sans parcourir le dossier
+        tant qu'elle est assez récente et qu'aucun fichier n'a été enregistré ou oublié depuis.
+        """
+        with self.verrou:
+            if self.liste is not None and time.monotonic() - self.liste_le < fraicheur:
+                return self.liste
+        entrees = self._entrees()
+        presents = set()
+        for fichier in os.scandir(self.dossier):
+            if not fichier.is_file() or fichier.name.startswith(".") or fichier.name.endswith(".part"):
+                continue
+            presents.add(fichier.name)
+            infos = fichier.stat()
+            entree = entrees.get(fichier.name)
+            if entree is None or entree[1] != infos.st_size or entree[2] != infos.st_mtime:
+                self.enregistrer(fichier.name)
+        for nom in set(entrees) - presents:
+            self.oublier(nom)
+        liste = [self.entree(nom) for nom in sorted(presents)]
+        with self.verrou:
+            self.liste, self.liste_le = liste, time.monotonic()
+        return liste
+
+    def entree(self, nom):
+        """Renvoie la fiche d'un fichier (schéma, lignes, statistiques) ou None."""
+        with self.verrou:
+            ligne = self.conn.execute("SELECT * FROM fichiers WHERE nom = ?", (nom,)).fetchone()
+        if ligne is None:
+            return None
+        nom, taille, mtime, empreinte, lignes, colonnes, stats, erreur, _, quarantaine = ligne
+        return {
+            "nom": nom,
+            "taille": taille,
+            "mtime": mtime,
+            "hash": empreinte,
+            "lignes": lignes,
+            "colonnes": json.loads(colonnes) if colonnes else [],
+            "stats": json.loads(stats) if stats else {},
+            "erreur": erreur,
+            "quarantaine": quarantaine,
+        }
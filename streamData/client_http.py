@@ -0,0 +1,108 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from cache_http import CacheHttp
+
+# le brotli (dans requirements.txt) n'est décodé par urllib3 que si le paquet est installé:
+# sans lui, on ne l'annonce pas au serveur
+try:
+    import brotli  # noqa: F401
+    ENCODAGES = "gzip, deflate, br"
+except ImportError:
+    ENCODAGES = "gzip, deflate"
+
+USER_AGENT = "Mozilla/5.0 (compatible; StreamData/1.0)"
+
+
+# client HTTP partagé par les scrapers: connexions keep-alive réutilisées et timeouts par défaut
+class ClientHttp:
+    def __init__(self, taille_pool=32, timeout=(5, 20), cache=None):
+        self.timeout = timeout
+        self.cache = cache
+
+        # aucune nouvelle tentative dans urllib3: erreurs réseau, timeouts, 429 et 5xx remontent
+        # au crawler, qui réessaie lui-même et ralentit tout l'hôte au lieu d'une seule requête
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=taille_pool, max_retries=Retry(total=0, read=False))
+
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "User-Agent": USER_AGENT,
+            "Accept-Encoding": ENCODAGES,
+            "Connection": "keep-alive",
+        })
+
+    def get(self, url, **kwargs):
+        """Envoie un GET en réutilisant les connexions du pool."""
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.get(url, **kwargs)
+
+    def get_octets(self, url):
+        """Renvoie le contenu brut d'une ressource (une image), sans passer par le cache disque."""
+        res = self.get(url)
+        res.raise_for_status()
+        return res.content
+
+    def en_cache(self, url, ttl=None):
+        """Renvoie la page si le cache en a une copie encore fraîche (ou en mode hors ligne), sinon None."""
+        if self.cache is None:
+            return None
+        entree = self.cache.lire(url, ttl)
+        if entree is not None and (entree["frais"] or self.cache.hors_ligne):
+            return entree["contenu"]
+        return None
+
+    def get_texte(self, url, ttl=None):
+        """Renvoie le HTML d'une page, en passant par le cache disque s'il est configuré."""
+        return self.lire_page(url, ttl)[0]
+
+    def lire_page(self, url, ttl=None):
+        """Comme get_texte, mais renvoie (html, statut, octets reçus): statut vaut « cache » pour
+        une copie fraîche, « revalide » quand le serveur a répondu 304, « ok » sinon."""
+        if self.cache is None:
+            res = self.get(url)
+            res.raise_for_status()
+            return res.text, "ok", len(res.content)
+
+        entree = self.cache.lire(url, ttl)
+        if entree is not None and (entree["frais"] or self.cache.hors_ligne):
+            return entree["contenu"], "cache", 0
+        if self.cache.hors_ligne:
+            raise LookupError(f"{url} absent du cache (mode hors ligne)")
+
+        # revalidation conditionnelle: le serveur répond 304 si la page n'a pas changé
+        headers = {}
+        if entree is not None:
+            if entree["etag"]:
+                headers["If-None-Match"] = entree["etag"]
+            if entree["last_modified"]:
+                headers["If-Modified-Since"] = entree["last_modified"]
+
+        res = self.get(url, headers=headers)
+        if res.status_code == 304 and entree is not None:
+            self.cache.revalider(url)
+            return entree["contenu"], "revalide", 0
+        res.raise_for_status()
+        self.cache.ecrire(url, res.text, res.headers.get("ETag"), res.headers.get("Last-Modified"))
+        return res.text, "ok", len(res.content)
+
+    def close(self):
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+
+
+_client = None
+_verrou = threading.Lock()
+
+def client_partage():
+    """Renvoie le client HTTP commun à tous les scrapers de l'application."""
+    global _client
+    with _verrou:
+        if _client is None:
+            _client = ClientHttp(cache=CacheHttp())
+        return _client
@@ -0,0 +1,213 @@
+import re
+
+from bs4 import BeautifulSoup as bs
+
+# lxml et selectolax sont optionnels: on retombe sur BeautifulSoup sans eux
+try:
+    from lxml import etree, html as lxml_html
+except ImportError:
+    lxml_html = None
+
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None
+
+
+# conversion d'un sélecteur css simple ("div.a.b span.c") en XPath,
+# suffisant pour les sélecteurs par balise et classes utilisés ici
+def css_vers_xpath(selecteur):
+    etapes = []
+    for morceau in selecteur.split():
+        balise, *classes = morceau.split(".")
+        conditions = "".join(
+            f"[contains(concat(' ', normalize-space(@class), ' '), ' {classe} ')]" for classe in classes
+        )
+        etapes.append(f"descendant::{balise or '*'}{conditions}")
+    return "./" + "/".join(etapes)
+
+
+# les backends exposent la même interface: compiler un sélecteur une seule fois,
+# puis l'appliquer à un document ou à un noeud
+class BackendLxml:
+    nom = "lxml"
+
+    def document(self, html):
+        return lxml_html.fromstring(html)
+
+    def compiler(self, selecteur):
+        return etree.XPath(css_vers_xpath(selecteur))
+
+    def trouver(self, noeud, compile):
+        return compile(noeud)
+
+    def texte(self, noeud):
+        return noeud.text_content()
+
+    def attribut(self, noeud, nom):
+        return noeud.get(nom)
+
+
+class BackendSelectolax:
+    nom = "selectolax"
+
+    def document(self, html):
+        return HTMLParser(html)
+
+    def compiler(self, selecteur):
+        return selecteur
+
+    def trouver(self, noeud, compile):
+        return noeud.css(compile)
+
+    def texte(self, noeud):
+        return noeud.text()
+
+    def attribut(self, noeud, nom):
+        return noeud.attributes.get(nom)
+
+
+class BackendBeautifulSoup:
+    nom = "bs4"
+
+    def document(self, html):
+        return bs(html, "html.parser")
+
+    def compiler(self, selecteur):
+        return selecteur
+
+    def trouver(self, noeud, compile):
+        return noeud.select(compile)
+
+    def texte(self, noeud):
+        return noeud.text
+
+    def attribut(self, noeud, nom):
+        return noeud.get(nom)
+
+
+BACKENDS = {"bs4": BackendBeautifulSoup}
+if lxml_html is not None:
+    BACKENDS["lxml"] = BackendLxml
+if HTMLParser is not None:
+    BACKENDS["selectolax"] = BackendSelectolax
+
+BACKEND_PAR_DEFAUT = "lxml" if "lxml" in BACKENDS else "bs4"
+
+
+# annonce écartée à l'extraction; le motif remonte des processus d'analyse jusqu'aux mesures
+class AnnonceIgnoree(Exception):
+    def __init__(self, motif):
+        super().__init__(motif)
+        self.motif = motif
+
+
+# liste d'annonces d'une page qui garde le décompte des conteneurs ignorés par motif;
+# elle traverse les processus d'analyse comme une liste ordinaire
+class Annonces(list):
+    def __init__(self, annonces=(), rejets=None):
+        super().__init__(annonces)
+        self.rejets = rejets or {}
+
+
+# description déclarative d'un champ: où le trouver et comment le convertir
+class Champ:
+    def __init__(self, selecteur, attribut=None, position=0, conversion=None):
+        self.selecteur = selecteur
+        self.attribut = attribut
+        self.position = position
+        self.conversion = conversion
+
+
+# extracteur compilé: les sélecteurs sont préparés une fois pour toutes à la création
+class Extracteur:
+    def __init__(self, champs, conteneur=None, backend=None):
+        self.backend = BACKENDS[backend or BACKEND_PAR_DEFAUT]()
+        self.conteneur = self.backend.compiler(conteneur) if conteneur else None
+        self.champs = [(nom, champ, self.backend.compiler(champ.selecteur)) for nom, champ in champs.items()]
+
+    def _extraire_noeud(self, noeud):
+        """Renvoie (enregistrement, None), ou (None, motif) dès qu'un champ manque."""
+        resultat = {}
+        for nom, champ, compile in self.champs:
+            trouves = self.backend.trouver(noeud, compile)
+            if len(trouves) <= champ.position:
+                return None, f"{nom} absent ({champ.selecteur})"
+            cible = trouves[champ.position]
+            valeur = self.backend.attribut(cible, champ.attribut) if champ.attribut else self.backend.texte(cible)
+            if valeur is None:
+                return None, f"{nom} absent ({champ.selecteur}@{champ.attribut})"
+            if champ.conversion is not None:
+                try:
+                    valeur = champ.conversion(valeur)
+                except (ValueError, IndexError):
+                    return None, f"{nom} illisible"
+            resultat[nom] = valeur
+        return resultat, None
+
+    def analyser(self, html):
+        """Comme extraire, mais renvoie aussi le motif du rejet: (enregistrement, motif)."""
+        document = self.backend.document(html)
+        if self.conteneur is not None:
+            conteneurs = self.backend.trouver(document, self.conteneur)
+            if not conteneurs:
+                return None, "conteneur absent"
+            document = conteneurs[0]
+        return self._extraire_noeud(document)
+
+    def extraire(self, html):
+        """Extrait un seul enregistrement de la page, ou None si un champ manque."""
+        return self.analyser(html)[0]
+
+    def extraire_tout(self, html, rejets=None):
+        """Extrait un enregistrement par conteneur, les conteneurs incomplets sont ignorés
+        (et comptés par motif dans le dictionnaire rejets s'il est fourni)."""
+        document = self.backend.document(html)
+        resultats = []
+        for noeud in self.backend.trouver(document, self.conteneur):
+            resultat, motif = self._extraire_noeud(noeud)
+            if resultat is not None:
+                resultats.append(resultat)
+            elif rejets is not None:
+                rejets[motif] = rejets.get(motif, 0) + 1
+        return resultats
+
+
+# conversions communes aux champs de coinafrique
+def en_entier(texte):
+    return int(re.sub(r"\s|CFA|m2", "", texte))
+
+def premier_mot(texte):
+    return texte.split()[0].capitalize()
+
+def sans_icone(texte):
+    return texte.replace("location_on", "")
+
+
+CONTENEUR_LISTE = "div.col.s6.m4.l3"
+LIEN_ANNONCE = "a.card-image.ad__card-image.waves-block.waves-light"
+
+CHAMPS_LISTE_VILLAS = {
+    "image lien": Champ("img.ad__card-img", attribut="src"),
+    "lien": Champ(LIEN_ANNONCE, attribut="href"),
+}
+
+CHAMPS_LISTE_TERRAINS = {
+    "img_link": Champ("img.ad__card-img", attribut="src"),
+    "prix": Champ("p.ad__card-price", conversion=en_entier),
+    "adresse": Champ("p.ad__card-location", conversion=sans_icone),
+    "lien": Champ(LIEN_ANNONCE, attribut="href"),
+}
+
+CONTENEUR_VILLA = "div.card.round.slide.proffer.z-depth-0.remove-background-white"
+
+CHAMPS_VILLA = {
+    "type annonce": Champ("h1.title.title-ad.hide-on-large-and-down", conversion=premier_mot),
+    "nombre pieces": Champ("span.qt", conversion=int),
+    "prix": Champ("p.price", conversion=en_entier),
+    "adresse": Champ("span.valign-wrapper", position=1),
+}
+
+CHAMPS_TERRAIN = {
+    "superficie": Champ("span.qt", conversion=en_entier),
+}
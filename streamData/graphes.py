@@ -0,0 +1,114 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from stockage import cle_fichier, lire_dataframe
+
+NOMBRE_INTERVALLES = 30
+POINTS_KDE = 512
+TOP_CATEGORIES = 20
+
+
+def intervalles(valeurs, nombre=NOMBRE_INTERVALLES, mode="fixes"):
+    """Bords des intervalles: de même largeur ou de même effectif (quantiles)."""
+    if mode == "quantiles":
+        bords = np.unique(np.quantile(valeurs, np.linspace(0, 1, nombre + 1)))
+        if len(bords) > 1:
+            return bords
+    return np.histogram_bin_edges(valeurs, bins=nombre)
+
+
+def kde_groupee(valeurs, points=POINTS_KDE):
+    """Densité estimée sur une grille: les valeurs sont regroupées sur la grille puis
+    convoluées avec un noyau gaussien, en O(n + points) au lieu de O(n * points)."""
+    n = len(valeurs)
+    ecart = np.std(valeurs)
+    q1, q3 = np.percentile(valeurs, [25, 75])
+    dispersion = min(ecart, (q3 - q1) / 1.34) or ecart
+    if n < 2 or dispersion == 0:
+        return None, None
+    # largeur de bande de Silverman
+    h = 0.9 * dispersion * n ** -0.2
+    debut, fin = valeurs.min() - 3 * h, valeurs.max() + 3 * h
+    comptes, bords = np.histogram(valeurs, bins=points, range=(debut, fin))
+    pas = bords[1] - bords[0]
+    demi = min(int(np.ceil(4 * h / pas)), points)
+    noyau = np.exp(-0.5 * (np.arange(-demi, demi + 1) * pas / h) ** 2)
+    noyau /= noyau.sum()
+    densite = np.convolve(comptes, noyau, mode="same") / (n * pas)
+    return (bords[:-1] + bords[1:]) / 2, densite
+
+
+def agreger_numerique(serie, nombre=NOMBRE_INTERVALLES, mode="fixes"):
+    valeurs = serie.to_numpy(dtype="float64", na_value=np.nan)
+    valeurs = valeurs[np.isfinite(valeurs)]
+    if not len(valeurs):
+        return {"type": "vide"}
+    bords = intervalles(valeurs, nombre, mode)
+    comptes, bords = np.histogram(valeurs, bins=bords)
+    x, densite = kde_groupee(valeurs)
+    return {"type": "numerique", "n": len(valeurs), "bords": bords, "comptes": comptes, "kde_x": x, "kde_y": densite}
+
+
+def agreger_categories(serie, top=TOP_CATEGORIES):
+    """Les `top` modalités les plus fréquentes, les autres sont regroupées dans « Autres »."""
+    comptes = serie.value_counts()
+    resultat = comptes.head(top)
+    reste = int(comptes.iloc[top:].sum())
+    if reste:
+        resultat = pd.concat([resultat.rename(index=str), pd.Series({"Autres": reste})])
+    return {"type": "categories", "comptes": resultat, "modalites": len(comptes)}
+
+
+def agreger(chemin, colonne, nombre=NOMBRE_INTERVALLES, mode="fixes", top=TOP_CATEGORIES):
+    """Agrégat d'une colonne pour le graphe; seule cette colonne est lue depuis la copie parquet."""
+    serie = lire_dataframe(chemin, colonnes=[colonne])[colonne]
+    if pd.api.types.is_bool_dtype(serie) or not pd.api.types.is_numeric_dtype(serie):
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            return {"type": "non_pris_en_charge", "dtype": str(serie.dtype)}
+        return agreger_categories(serie, top)
+    return agreger_numerique(serie, nombre, mode)
+
+
+# les agrégats sont petits (quelques dizaines de valeurs): on les garde par
+# (fichier, colonne, paramètres), le rendu ne dépend donc plus du nombre de lignes
+class CacheAgregats:
+    def __init__(self, taille_max=256):
+        self.taille_max = taille_max
+        self.entrees = OrderedDict()
+        self.verrou = threading.Lock()
+
+    def agreger(self, chemin, colonne, nombre=NOMBRE_INTERVALLES, mode="fixes", top=TOP_CATEGORIES):
+        cle = (cle_fichier(chemin), colonne, nombre, mode, top)
+        with self.verrou:
+            if cle in self.entrees:
+                self.entrees.move_to_end(cle)
+                return self.entrees[cle]
+        agregat = agreger(chemin, colonne, nombre, mode, top)
+        with self.verrou:
+            self.entrees[cle] = agregat
+            while len(self.entrees) > self.taille_max:
+                self.entrees.popitem(last=False)
+        return agregat
+
+
+def tracer_histogramme(agregat, ax):
+    bords, comptes = agregat["bords"], agregat["comptes"]
+    largeurs = np.diff(bords)
+    if np.allclose(largeurs, largeurs[0]):
+        # intervalles de même largeur: effectifs, la densité est remise à la même échelle
+        hauteurs, echelle, legende = comptes, agregat["n"] * largeurs[0], "Effectif"
+    else:
+        # intervalles de même effectif: seule la densité est comparable d'une barre à l'autre
+        hauteurs, echelle, legende = comptes / (agregat["n"] * largeurs), 1, "Densité"
+    ax.bar(bords[:-1], hauteurs, width=largeurs, align="edge", edgecolor="white")
+    if agregat["kde_x"] is not None:
+        ax.plot(agregat["kde_x"], agregat["kde_y"] * echelle)
+    ax.set_ylabel(legende)
+
+
+def tracer_barres(agregat, ax):
+    agregat["comptes"].plot(kind="bar", ax=ax)
+    ax.set_ylabel("Effectif")
@@ -0,0 +1,157 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from cache_http import DOSSIER_CACHE
+from index_annonces import MOTIF_ID
+from normalisation import COLONNES_PRIX
+
+# colonnes qui changent d'un instantané à l'autre sans que l'annonce change
+COLONNES_VOLATILES = ("web-scraper-order", "web-scraper-start-url")
+
+
+def cles_annonces(df):
+    """Clé de chaque ligne: l'identifiant de l'annonce s'il est connu (colonne « id annonce »
+    ou URL d'annonce), sinon un hash du contenu hors prix pour les fichiers sans identifiant."""
+    ids = pd.Series(pd.NA, index=df.index, dtype="Int64")
+    for colonne in df.columns:
+        if str(colonne).lower() == "id annonce":
+            ids = ids.fillna(pd.to_numeric(df[colonne], errors="coerce").astype("Int64"))
+        elif df[colonne].dtype == object or isinstance(df[colonne].dtype, (pd.StringDtype, pd.CategoricalDtype)):
+            texte = df[colonne].astype("string")
+            if texte.str.contains("/annonce/", regex=False, na=False).any():
+                trouves = texte.str.extract(MOTIF_ID.pattern)[0]
+                ids = ids.fillna(pd.to_numeric(trouves, errors="coerce").astype("Int64"))
+
+    contenu = [c for c in df.columns if str(c).lower() not in COLONNES_PRIX + COLONNES_VOLATILES]
+    empreintes = pd.util.hash_pandas_object(df[contenu].astype("string"), index=False)
+    cles = "h:" + empreintes.map("{:016x}".format).astype("string")
+    return cles.mask(ids.notna(), "id:" + ids.astype("string")), ids
+
+
+# index des annonces à travers les scrapings successifs: une table consolidée (une ligne
+# par annonce, dernière version connue) et l'historique des prix, où un point n'est
+# ajouté que lorsque le prix change; la base grandit avec les changements, pas les instantanés
+class HistoriqueAnnonces:
+    def __init__(self, chemin=os.path.join(DOSSIER_CACHE, "historique.sqlite")):
+        self.verrou = threading.Lock()
+        dossier = os.path.dirname(chemin)
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+        self.conn = sqlite3.connect(chemin, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS annonces (
+                cle TEXT PRIMARY KEY,
+                categorie TEXT NOT NULL,
+                id_annonce INTEGER,
+                prix REAL,
+                donnees TEXT NOT NULL,
+                premiere_vue REAL NOT NULL,
+                derniere_vue REAL NOT NULL,
+                vues INTEGER NOT NULL,
+                source TEXT
+            );
+            CREATE TABLE IF NOT EXISTS prix (
+                cle TEXT NOT NULL,
+                vu_le REAL NOT NULL,
+                prix REAL,
+                source TEXT
+            );
+            CREATE INDEX IF NOT EXISTS prix_par_cle ON prix (cle, vu_le);
+            CREATE TEMP TABLE lot (cle TEXT PRIMARY KEY, id_annonce INTEGER, prix REAL, donnees TEXT);
+        """)
+        self.conn.commit()
+
+    def integrer(self, df, categorie, source=None, vu_le=None):
+        """Intègre un instantané; renvoie le nombre d'annonces nouvelles, modifiées et inchangées."""
+        vu_le = vu_le or time.time()
+        cles, ids = cles_annonces(df)
+        colonne_prix = next((c for c in df.columns if str(c).lower() in COLONNES_PRIX), None)
+        prix = pd.to_numeric(df[colonne_prix], errors="coerce") if colonne_prix is not None else pd.Series(float("nan"), index=df.index)
+        lot = pd.DataFrame({
+            "cle": cles,
+            "id_annonce": ids.astype("object").where(ids.notna(), None),
+            "prix": prix.astype("float64").astype("object").where(prix.notna(), None),
+            "donnees": df.to_json(orient="records", lines=True, force_ascii=False).splitlines() if len(df) else [],
+        }).drop_duplicates("cle", keep="last")
+
+        with self.verrou:
+            self.conn.execute("DELETE FROM lot")
+            self.conn.executemany("INSERT INTO lot VALUES (?, ?, ?, ?)", lot.itertuples(index=False, name=None))
+            nouvelles, modifiees = self.conn.execute("""
+                SELECT SUM(a.cle IS NULL), SUM(a.cle IS NOT NULL AND a.prix IS NOT l.prix)
+                FROM lot l LEFT JOIN annonces a ON a.cle = l.cle
+            """).fetchone()
+            # un point d'historique pour chaque nouvelle annonce et chaque changement de prix
+            self.conn.execute("""
+                INSERT INTO prix (cle, vu_le, prix, source)
+                SELECT l.cle, ?, l.prix, ? FROM lot l LEFT JOIN annonces a ON a.cle = l.cle
+                WHERE a.cle IS NULL OR a.prix IS NOT l.prix
+            """, (vu_le, source))
+            self.conn.execute("""
+                INSERT INTO annonces (cle, categorie, id_annonce, prix, donnees, premiere_vue, derniere_vue, vues, source)
+                SELECT cle, ?, id_annonce, prix, donnees, ?, ?, 1, ? FROM lot WHERE true
+                ON CONFLICT (cle) DO UPDATE SET
+                    prix = excluded.prix, donnees = excluded.donnees, derniere_vue = excluded.derniere_vue,
+                    vues = vues + 1, source = excluded.source
+            """, (categorie, vu_le, vu_le, source))
+            self.conn.execute("DELETE FROM lot")
+            self.conn.commit()
+        nouvelles, modifiees = nouvelles or 0, modifiees or 0
+        return {"nouvelles": nouvelles, "modifiees": modifiees, "inchangees": len(lot) - nouvelles - modifiees}
+
+    def consolidees(self, categorie=None):
+        """Dernière version connue de chaque annonce."""
+        requete = "SELECT cle, premiere_vue, derniere_vue, vues, donnees FROM annonces"
+        parametres = ()
+        if categorie is not None:
+            requete += " WHERE categorie = ?"
+            parametres = (categorie,)
+        with self.verrou:
+            lignes = self.conn.execute(requete, parametres).fetchall()
+        if not lignes:
+            return pd.DataFrame()
+        cles, premieres, dernieres, vues, donnees = zip(*lignes)
+        df = pd.DataFrame.from_records([json.loads(ligne) for ligne in donnees])
+        return df.assign(cle=cles, premiere_vue=pd.to_datetime(premieres, unit="s"),
+                         derniere_vue=pd.to_datetime(dernieres, unit="s"), vues=vues)
+
+    def historique_prix(self, cle):
+        with self.verrou:
+            lignes = self.conn.execute("SELECT vu_le, prix, source FROM prix WHERE cle = ? ORDER BY vu_le", (cle,)).fetchall()
+        df = pd.DataFrame(lignes, columns=["vu_le", "prix", "source"])
+        df["vu_le"] = pd.to_datetime(df["vu_le"], unit="s")
+        return df
+
+    def variations(self, categorie=None, limite=50):
+        """Derniers changements de prix (ancien et nouveau prix), du plus récent au plus ancien."""
+        requete = """
+            SELECT cle, categorie, vu_le, ancien_prix, nouveau_prix, source FROM (
+                SELECT p.cle, a.categorie, p.vu_le, LAG(p.prix) OVER suivi AS ancien_prix,
+                       p.prix AS nouveau_prix, p.source, ROW_NUMBER() OVER suivi AS rang
+                FROM prix p JOIN annonces a ON a.cle = p.cle
+                WINDOW suivi AS (PARTITION BY p.cle ORDER BY p.vu_le)
+            ) WHERE rang > 1 AND (? IS NULL OR categorie = ?)
+            ORDER BY vu_le DESC LIMIT ?
+        """
+        with self.verrou:
+            lignes = self.conn.execute(requete, (categorie, categorie, limite)).fetchall()
+        df = pd.DataFrame(lignes, columns=["cle", "categorie", "vu_le", "ancien_prix", "nouveau_prix", "source"])
+        df["vu_le"] = pd.to_datetime(df["vu_le"], unit="s")
+        df["variation %"] = (df["nouveau_prix"] / df["ancien_prix"] - 1) * 100
+        return df
+
+    def resume(self):
+        with self.verrou:
+            annonces, changements = self.conn.execute(
+                "SELECT (SELECT COUNT(*) FROM annonces), (SELECT COUNT(*) FROM prix) - (SELECT COUNT(*) FROM annonces)"
+            ).fetchone()
+        return {"annonces": annonces, "changements": changements}
+
+    def close(self):
+        with self.verrou:
+            self.conn.close()
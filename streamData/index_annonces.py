@@ -0,0 +1,60 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from cache_http import DOSSIER_CACHE
+
+# les URL des annonces se terminent par un identifiant numérique stable: ...-2041560
+MOTIF_ID = re.compile(r"-(\d+)/?$")
+
+def extraire_id(url):
+    """Renvoie l'identifiant numérique d'une annonce à partir de son URL, ou None."""
+    trouve = MOTIF_ID.search(url)
+    return int(trouve.group(1)) if trouve else None
+
+
+# index persistant des annonces déjà scrapées, par catégorie
+class IndexAnnonces:
+    def __init__(self, chemin=os.path.join(DOSSIER_CACHE, "annonces.sqlite")):
+        self.verrou = threading.Lock()
+        dossier = os.path.dirname(chemin)
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+        self.conn = sqlite3.connect(chemin, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS annonces_vues (
+                categorie TEXT NOT NULL,
+                id_annonce INTEGER NOT NULL,
+                vue_le REAL NOT NULL,
+                PRIMARY KEY (categorie, id_annonce)
+            )
+        """)
+        self.conn.commit()
+
+    def connus(self, categorie, ids):
+        """Renvoie le sous-ensemble des identifiants déjà présents dans l'index."""
+        ids = [i for i in set(ids) if i is not None]
+        if not ids:
+            return set()
+        with self.verrou:
+            marqueurs = ",".join("?" * len(ids))
+            lignes = self.conn.execute(
+                f"SELECT id_annonce FROM annonces_vues WHERE categorie = ? AND id_annonce IN ({marqueurs})",
+                [categorie, *ids],
+            ).fetchall()
+        return {ligne[0] for ligne in lignes}
+
+    def ajouter(self, categorie, ids):
+        maintenant = time.time()
+        with self.verrou:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO annonces_vues VALUES (?, ?, ?)",
+                [(categorie, i, maintenant) for i in set(ids) if i is not None],
+            )
+            self.conn.commit()
+
+    def close(self):
+        with self.verrou:
+            self.conn.close()
@@ -2,20 +2,91 @@ import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 import time
-import seaborn as sns
 import webbrowser
 import os
-from utils import scrap_terrains, scrap_villas , google_forms, kobo_forms, mot_inspirant, streamdata_logo
+from analyse import FONCTIONS, Requete, colonnes_derivees, colonnes_numeriques, executer
+from apercu import OPERATEURS, lire_page
+from cache_df import CacheDataFrames
+from catalogue import Catalogue
+from graphes import CacheAgregats, tracer_barres, tracer_histogramme
+from historique import HistoriqueAnnonces
+from mesures import mesures_globales
+from normalisation import COLONNES_PRIX
+from profilage import apercu_debut
+from stockage import lire_quarantaine, supprimer
+from taches import GestionnaireTaches, EN_COURS, TERMINEE, ECHOUEE
+from telechargements import ServeurFichiers
+from televersement import FichierInvalide, Televersements
+from utils import google_forms, kobo_forms, mot_inspirant, streamdata_logo
+from vignettes import MagasinVignettes, colonne_image
 
 # define the directory
 UPLOAD_DIR = "update_files"
+# fichiers affichés par page dans Bibliothèque
+FICHIERS_PAR_PAGE = 25
+# délai avant de reparcourir le dossier (fichiers écrits par le planificateur, hors de l'appli)
+FRAICHEUR_CATALOGUE = 30
 
 # ceci c'est pour créer le repertoire là ou les fichiers seront sauvegarder s'il n'existes pas déjà
-if not os.path.exists(UPLOAD_DIR):
-    os.mkdirs(UPLOAD_DIR)
+os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-# lister tous les fichiers contenus dans data
-files = os.listdir(UPLOAD_DIR)
+# le catalogue et le gestionnaire de tâches sont partagés par toutes les sessions
+@st.cache_resource
+def catalogue():
+    return Catalogue(UPLOAD_DIR)
+
+# les aperçus, quarantaines et résultats de requêtes de la page Visualisation sont gardés
+# par version de fichier: un rerun de Streamlit ne les recalcule pas
+@st.cache_resource
+def cache_dataframes():
+    return CacheDataFrames()
+
+@st.cache_resource
+def cache_agregats():
+    return CacheAgregats()
+
+@st.cache_resource
+def historique():
+    return HistoriqueAnnonces()
+
+@st.cache_resource
+def serveur_fichiers():
+    try:
+        return ServeurFichiers(UPLOAD_DIR).demarrer()
+    except OSError:
+        pass
+    try:
+        # port déjà pris (autre instance de l'appli): un port libre choisi par le système
+        return ServeurFichiers(UPLOAD_DIR, port=0).demarrer()
+    except OSError:
+        # pas de serveur de fichiers: les téléchargements passent par Streamlit
+        return None
+
+def lien_telechargement(nom):
+    """Lien du serveur de fichiers pour ce navigateur, ou None s'il ne peut pas le joindre."""
+    serveur = serveur_fichiers()
+    if serveur is None:
+        return None
+    contexte = getattr(st, "context", None)
+    hote = contexte.headers.get("Host") if contexte is not None else None
+    return serveur.lien(nom, hote)
+
+@st.cache_resource
+def televersements():
+    return Televersements(UPLOAD_DIR, catalogue=catalogue(), historique=historique())
+
+@st.cache_resource
+def magasin_vignettes():
+    return MagasinVignettes()
+
+@st.cache_resource
+def gestionnaire_taches():
+    return GestionnaireTaches(catalogue=catalogue(), historique=historique(), magasin_vignettes=magasin_vignettes())
+
+# lister tous les fichiers contenus dans data, depuis le catalogue (seuls les fichiers modifiés sont relus);
+# les uploads, scrapings et suppressions de l'appli mettent la liste à jour aussitôt
+fiches = {fiche["nom"]: fiche for fiche in catalogue().lister(FRAICHEUR_CATALOGUE)}
+files = list(fiches)
 
 # La partie CSS pour le styling
 st.markdown(
@@ -57,7 +128,7 @@ def change_page(page):
 with st.sidebar:
     st.title("StreamData")
     
-    page = st.selectbox("Choisir une page", ["Accueil", "Scraper", "Upload", "Visualisation", "Bibliothèque", "Feedback"])
+    page = st.selectbox("Choisir une page", ["Accueil", "Scraper", "Upload", "Visualisation", "Bibliothèque", "Diagnostics", "Feedback"])
     st.session_state.selected_page = page
     st.markdown("---")
     
@@ -87,7 +158,7 @@ if st.session_state.selected_page == "Accueil":
         
         ---
         
-        - Bibliothèques Python: streamlit, pandas, matplotlib, seaborn
+        - Bibliothèques Python: streamlit, pandas, matplotlib
         - Source de données: coinafrique. [Terrains](https://sn.coinafrique.com/categorie/terrains) | [Villas](https://sn.coinafrique.com/categorie/villas)
         
         ---
@@ -108,17 +179,14 @@ elif st.session_state.selected_page == "Scraper":
     st.title("Scraper des données")
     st.write("🌐 Sur cette page, il est possible de scraper avec BeautifulSoup")
     st.write("Le scrapping terminé, vous pourrez retrouver le fichier dans **Bibliothèque**!!")
-    st.write("*Ne quittez pas la page tant que le scraping n'est pas terminé!*")
-    
-    def reset_form():
-        st.session_state["categorie"] = "Choisir une catégorie..."
-        st.session_state["num_pages"] = 1
-        st.session_state["file_name"] = ""
+    st.write("*Le scraping tourne en arrière-plan: vous pouvez changer de page pendant ce temps.*")
     
     with st.form("scraper_form"):
         categorie = st.selectbox("Choisir une catégorie...", ["Terrains", "Villas"])
         num_pages = st.number_input("📄 Nombre de pages", min_value=1, value=1)
         file_name = st.text_input("💾 Nom du fichier CSV", placeholder="data.csv")
+        incremental = st.checkbox("🔁 Mode incrémental (seulement les nouvelles annonces, ajoutées au fichier)")
+        vignettes = st.checkbox("🖼️ Télécharger les vignettes des images (colonne « vignette »)")
         submit = st.form_submit_button("🚀 Commencer le scraping")
 
     if submit:
@@ -127,37 +195,35 @@ elif st.session_state.selected_page == "Scraper":
             st.error("❌ Veuillez donner un nom au fichier!")
         else:
             csv_path = os.path.join(UPLOAD_DIR, file_name)
-            
-            # pour lancer un minuteur qui afficher le temps du scraping
-            start_time = time.time()
-            
-            # Call the correct function based on selection
-            if categorie == "Terrains":
-                with st.spinner("Scraping en cours..."):
-                    df = scrap_terrains(num_pages)
-                    while time.time() - start_time < 60:  # Limite de 60 secondes pour éviter un blocage
-                        elapsed_time = time.time() - start_time
-                        time.sleep(1)  # Pause d'une seconde pour rafraîchir l'affichage
-                        reset_form()
-
+            try:
+                id_tache = gestionnaire_taches().soumettre(categorie.lower(), num_pages, csv_path, incremental, vignettes)
+            except ValueError as e:
+                st.error(f"❌ Impossible de lancer le scraping: {e}")
             else:
-                with st.spinner("Scraping en cours..."):
-                    df = scrap_villas(num_pages)
-                    while time.time() - start_time < 60:  # Limite de 60 secondes pour éviter un blocage
-                        elapsed_time = time.time() - start_time
-                        time.sleep(1)  # Pause d'une seconde pour rafraîchir l'affichage
-                        reset_form()
+                st.success(f"✅ Scraping n°{id_tache} lancé, `{file_name}` apparaîtra dans ***Bibliothèque*** à la fin")
 
-
-            if not df.empty:
-                df.to_csv(csv_path, index=False)
-                elapsed_time = time.time() - start_time
-                st.success(f"✅ Scraping terminé en {elapsed_time:.2f} secondes !")
-
-                st.success(f"✅ `{file_name}` sauvegardé dans ***Bibliothèque*** ")
-                st.dataframe(df) 
+    # suivi des tâches de scraping (toutes sessions confondues)
+    st.subheader("Scrapings récents")
+    st.button("🔄 Rafraîchir")
+    taches = gestionnaire_taches().taches()
+    if taches:
+        for tache in taches:
+            nom = os.path.basename(tache["chemin"])
+            if tache["statut"] == EN_COURS:
+                st.write(f"⏳ n°{tache['id']} `{nom}` ({tache['categorie']}, {tache['nbre_pages']} pages): "
+                         f"{tache['lignes']} annonces récupérées...")
+                # les lignes déjà écrites se trouvent dans le fichier temporaire (seul le csv se lit en cours d'écriture)
+                if not tache["chemin"].endswith(".parquet") and os.path.exists(tache["chemin"] + ".part"):
+                    st.dataframe(pd.read_csv(tache["chemin"] + ".part", on_bad_lines="skip").tail(200))
+            elif tache["statut"] == TERMINEE:
+                duree = tache["fin"] - tache["debut"]
+                st.write(f"✅ n°{tache['id']} `{nom}`: {tache['lignes']} annonces en {duree:.2f} secondes")
+            elif tache["statut"] == ECHOUEE:
+                st.write(f"❌ n°{tache['id']} `{nom}`: échec ({tache['erreur']})")
             else:
-                st.warning("⚠️ Pas de données trouvées!")
+                st.write(f"⚠️ n°{tache['id']} `{nom}`: {tache['statut']}")
+    else:
+        st.write("*Aucun scraping pour le moment.*")
     
 # La page pour charger les fichiers, intituler "upload"
 elif st.session_state.selected_page == "Upload":
@@ -166,15 +232,32 @@ elif st.session_state.selected_page == "Upload":
     file_uploader = st.file_uploader("Choisir un fichier", type=["csv", "xlsx"])
     
     
-    if file_uploader is not None:
-        # Save the uploaded file to the specified directory
-        file_path = os.path.join(UPLOAD_DIR, file_uploader.name)
-    
-    # Write the uploaded file to the file system
-        with open(file_path, "wb") as f:
-            f.write(file_uploader.getbuffer())
-            
-        st.success(f"**{file_uploader.name}** a été chargé et sauvegarder dans Bibliothèque")
+    # le fichier reste sélectionné d'un rendu à l'autre: il n'est reçu qu'une fois
+    if file_uploader is not None and st.session_state.get("dernier_upload") != (file_uploader.name, file_uploader.size):
+        try:
+            # écrit sur disque par blocs et vérifié avant d'entrer dans la bibliothèque
+            televersements().recevoir(file_uploader, file_uploader.name)
+            st.session_state["dernier_upload"] = (file_uploader.name, file_uploader.size)
+            if file_uploader.name.lower().endswith(".xlsx"):
+                st.success(f"**{file_uploader.name}** a été reçu, il apparaîtra dans Bibliothèque une fois converti")
+            else:
+                st.success(f"**{file_uploader.name}** a été chargé et sauvegarder dans Bibliothèque")
+        except FichierInvalide as e:
+            st.error(f"❌ Le fichier n'a pas été chargé: {e}")
+
+    # conversions en arrière-plan (copie parquet, catalogue, historique des annonces)
+    recents = televersements().recents()
+    if recents:
+        st.write("Derniers fichiers reçus: ")
+        for etat in recents:
+            if etat["statut"] == EN_COURS:
+                st.info(f"⏳ {etat['nom']}: conversion en cours")
+            elif etat["statut"] == ECHOUEE:
+                st.warning(f"⚠️ {etat['nom']}: la conversion a échoué ({etat['erreur']})")
+            else:
+                st.write(f"✅ {etat['nom']}: prêt")
+        if any(etat["statut"] == EN_COURS for etat in recents) and st.button("Actualiser"):
+            st.rerun()
 
 # La page réservée au Visualisation
 elif st.session_state.selected_page == "Visualisation":
@@ -188,91 +271,165 @@ elif st.session_state.selected_page == "Visualisation":
     selected_file = st.selectbox('Sélectionner un fichier:', options)
     
     if selected_file:
-        df = pd.read_csv(os.path.join(UPLOAD_DIR, selected_file))
+        file_path = os.path.join(UPLOAD_DIR, selected_file)
 
-        # Step 3: un résumé du dataframe
+        # Step 3: un résumé du dataframe, tiré du profil enregistré dans le catalogue
+        # (profil de la copie normalisée: les mêmes lignes et types que les graphes)
+        fiche = fiches[selected_file]
+        # le catalogue connaît le nombre de lignes en quarantaine: le fichier n'est lu que s'il y en a
+        quarantaine = cache_dataframes().memoiser(file_path, lire_quarantaine) if fiche["quarantaine"] != 0 else None
         st.subheader(f"Résumé de {selected_file}")
-        st.write(f"Shape du dataframe: {df.shape}")
+        st.write(f"Shape du dataframe: ({fiche['lignes']}, {len(fiche['colonnes'])})")
+        if quarantaine is not None and fiche["lignes"] is not None:
+            st.write(f"{fiche['lignes'] + len(quarantaine)} lignes dans le fichier source: "
+                     f"{fiche['lignes']} gardées, {len(quarantaine)} en quarantaine")
         st.write("Les colonnes")
-        for i in df.columns:
-            st.write(f"- **{i}** | Type de données: **{df[i].dtype}**")
+        for nom, type_colonne in fiche["colonnes"]:
+            st.write(f"- **{nom}** | Type de données: **{type_colonne}**")
+
+        resume = pd.DataFrame([
+            {
+                "colonne": nom,
+                "manquants": profil["manquants"],
+                "distincts (≈)": profil["distincts"],
+                "min": profil.get("min"),
+                "max": profil.get("max"),
+                "moyenne": profil.get("moyenne"),
+                "plus fréquentes": ", ".join(f"{valeur} ({nombre})" for valeur, nombre in profil["top"][:3]),
+            }
+            for nom, profil in fiche["stats"].items()
+        ])
+        st.dataframe(resume)
         
         st.write("Aperçu des premières lignes: ")
-        st.dataframe(df.head())
+        st.dataframe(cache_dataframes().memoiser(file_path, apercu_debut))
+
+        # lignes écartées par la normalisation (prix, surface, pièces illisibles ou hors bornes)
+        if quarantaine is not None:
+            with st.expander(f"⚠️ {len(quarantaine)} ligne(s) mise(s) en quarantaine"):
+                st.dataframe(quarantaine)
         
         # ici l'utilisateur pourra choisir une colonne pour faire un graphe
         # la colonne choisit fera l'objet d'une condition pour vérifier si 
         # elle est numeric ou catégorielle afin de faire le graph approprié
         st.subheader("Partie graphes")
+        colonnes = [nom for nom, _ in fiche["colonnes"]]
         
-        if len(df.columns) > 6:
-            st.error("Visualisation non disponible")
-        else:
+        selected_column = st.selectbox('Choisissez une colonne pour faire un graphe:', colonnes)
+        
+        # les graphes sont tracés à partir d'agrégats (intervalles, top des modalités)
+        # calculés une fois par fichier et par colonne, quel que soit le nombre de lignes
+        col1, col2, col3 = st.columns(3)
+        mode = col1.radio("Intervalles", ["fixes", "quantiles"], horizontal=True)
+        nombre = col2.slider("Nombre d'intervalles", 5, 100, 30)
+        top = col3.slider("Modalités affichées", 5, 50, 20)
+        agregat = cache_agregats().agreger(file_path, selected_column, nombre, mode, top)
+
+        if agregat["type"] == "numerique":
+            st.subheader(f"Graphe pour : {selected_column}")
             
-            selected_column = st.selectbox('Choisissez une colonne pour faire un graphe:', df.columns)
+            # Display a histogram or other plot
+            fig, ax = plt.subplots()
+            tracer_histogramme(agregat, ax)
+            st.pyplot(fig)
+
+        elif agregat["type"] == "categories":  # Categorical column
+            st.subheader(f"Graphe pour: {selected_column}")
+            if agregat["modalites"] > top:
+                st.write(f"_{agregat['modalites']} modalités, les moins fréquentes sont regroupées dans « Autres »._")
             
-            # on vérifie d'abord si le dataframe a plus de 5 variables, si non on ne fait rien
-            # selon les capacités de l'appli
-            # on vérifie la nature de la variable
-            if df[selected_column].dtype in ['int64', 'float64']:
-                st.subheader(f"Graphe pour : {selected_column}")
-                
-                # Display a histogram or other plot
-                fig, ax = plt.subplots()
-                sns.histplot(df[selected_column], kde=True, ax=ax)
-                st.pyplot(fig)
+            # Display a bar chart
+            fig, ax = plt.subplots()
+            tracer_barres(agregat, ax)
+            st.pyplot(fig)
         
-            elif df[selected_column].dtype == 'object':  # Categorical column
-                st.subheader(f"Graphe pour: {selected_column}")
-                
-                # Display a bar chart
-                fig, ax = plt.subplots()
-                df[selected_column].value_counts().plot(kind='bar', ax=ax)
-                st.pyplot(fig)
-            
-            else:
-                st.warning(f"Type de colonne non pris en charge pour la visualisation: {df[selected_column].dtype}")
+        elif agregat["type"] == "vide":
+            st.warning(f"La colonne {selected_column} ne contient aucune valeur numérique.")
+
+        else:
+            st.warning(f"Type de colonne non pris en charge pour la visualisation: {agregat['dtype']}")
+
+        # analyse sur toutes les colonnes: les calculs sont faits par le moteur de requêtes
+        # (duckdb ou polars s'ils sont installés) et seules les colonnes utiles sont lues
+        st.subheader("Analyse")
+        derivees = colonnes_derivees(colonnes)
+        selection = st.multiselect("Colonnes à afficher", colonnes + list(derivees), default=colonnes + list(derivees))
+        if selection:
+            st.write("Les 100 premières lignes: ")
+            requete = Requete(colonnes=selection, derivees=derivees, limite=100)
+            st.dataframe(cache_dataframes().memoiser(file_path, executer, requete))
+
+        col1, col2, col3 = st.columns(3)
+        groupe = col1.selectbox("Regrouper par", [""] + colonnes)
+        valeur = col2.selectbox("Valeur", colonnes_numeriques(file_path) + list(derivees))
+        fonction = col3.selectbox("Fonction", FONCTIONS)
+        if groupe and valeur:
+            agregats = [(valeur, fonction)] + ([(valeur, "nombre")] if fonction != "nombre" else [])
+            requete = Requete(groupes=[groupe], agregats=agregats, derivees=derivees, limite=50)
+            resultat = cache_dataframes().memoiser(file_path, executer, requete)
+            st.write(f"{fonction.capitalize()} de {valeur} par {groupe} (50 premiers groupes): ")
+            st.dataframe(resultat)
+
+            fig, ax = plt.subplots()
+            resultat.head(20).set_index(groupe)[requete.nom_agregat(valeur, fonction)].plot(kind="bar", ax=ax)
+            st.pyplot(fig)
 
 # La Bibliothèque, là ou tous les fichiers sont stockés, on peut télécharger ou supprimer des fichiers 
 elif st.session_state.selected_page == "Bibliothèque":
     st.title("Bibliothèque")
     st.write("Accéder tous les fichiers stockés sur le site!!")
     delete_message = st.empty()
+
+    actives = gestionnaire_taches().actives()
+    if actives:
+        st.info(f"⏳ {len(actives)} scraping(s) en cours, les fichiers apparaîtront ici une fois terminés.")
+    conversions = televersements().en_cours()
+    if conversions:
+        st.info(f"⏳ {len(conversions)} fichier(s) chargé(s) en cours de conversion.")
     
     
     if files:
-        for file_name in files:
+        # seule une page de la liste est rendue: le coût d'affichage ne dépend pas de la taille de la bibliothèque
+        col1, col2 = st.columns([3, 1])
+        recherche = col1.text_input("Rechercher un fichier", key="bibliotheque_recherche")
+        visibles = [nom for nom in files if recherche.lower() in nom.lower()]
+        nbre_pages_liste = max(1, -(-len(visibles) // FICHIERS_PAR_PAGE))
+        page_liste = col2.number_input(f"Page (sur {nbre_pages_liste})", min_value=1, max_value=nbre_pages_liste, value=1, key="bibliotheque_page")
+        debut_liste = (page_liste - 1) * FICHIERS_PAR_PAGE
+
+        for file_name in visibles[debut_liste:debut_liste + FICHIERS_PAR_PAGE]:
             file_path = os.path.join(UPLOAD_DIR, file_name)
             
             col1, col2, col3 = st.columns([3, 0.5, 0.5])
 
             with col1:
-                if st.button(f"📄 {file_name}"):
+                fiche = fiches[file_name]
+                details = f"{fiche['lignes']} lignes, {fiche['taille'] / 1024:.0f} Ko" if fiche["lignes"] is not None else f"{fiche['taille'] / 1024:.0f} Ko"
+                if st.button(f"📄 {file_name} ({details})", key=f"ouvrir_{file_name}"):
                     file_ext = file_name.split(".")[-1]
                     if file_ext in ["csv", "xlsx"]:
-                        try:
-                            df = pd.read_csv(file_path) if file_ext == "csv" else pd.read_excel(file_path)
-                            st.write(f"### Lecture du fichier {file_name}")
-                            st.dataframe(df)
-                        except Exception as e:
-                            st.error(f"Erreur lors de la lecture du fichier")
+                        st.session_state["apercu_fichier"] = file_name
+                        st.session_state["apercu_page"] = 1
                     else:
                         st.write("⚠️ Ce type de fichier n'est pas supporté.")
 
             with col2:
-                with open(file_path, "rb") as f:
-                    st.download_button(
-                        label="⬇️",
-                        data=f,
-                        file_name=file_name,
-                        mime="application/octet-stream",
-                        key=f"download_{file_name}"
-                    )
+                # simple lien: le fichier n'est lu (sendfile, ou gzip pour les csv) que s'il est téléchargé
+                lien = lien_telechargement(file_name)
+                if lien is not None:
+                    st.link_button("⬇️", lien)
+                # serveur de fichiers injoignable: le fichier n'est lu qu'une fois demandé, un seul à la fois
+                elif st.button("⬇️", key=f"preparer_{file_name}") or st.session_state.get("telechargement") == file_name:
+                    st.session_state["telechargement"] = file_name
+                    with open(file_path, "rb") as f:
+                        st.download_button("💾", f.read(), file_name=file_name, key=f"telecharger_{file_name}")
 
             with col3:
                 if st.button(f"🗑️", key=f"delete_{file_name}"):
                     try:
-                        os.remove(file_path)
+                        supprimer(file_path)
+                        catalogue().oublier(file_name)
+                        cache_dataframes().invalider(file_path)
                         delete_message.success(f"✅ {file_name} a été supprimé avec succès.")
                         time.sleep(1)
                         st.rerun()
@@ -281,9 +438,120 @@ elif st.session_state.selected_page == "Bibliothèque":
 
         
 
+        # aperçu paginé du fichier ouvert: seules les lignes de la page affichée sont lues,
+        # le tri et le filtre sont faits par le lecteur parquet
+        apercu_fichier = st.session_state.get("apercu_fichier")
+        if apercu_fichier in fiches:
+            st.write(f"### Lecture du fichier {apercu_fichier}")
+            noms_colonnes = [nom for nom, _ in fiches[apercu_fichier]["colonnes"]]
+
+            col1, col2, col3, col4 = st.columns(4)
+            lignes_par_page = col1.selectbox("Lignes par page", [50, 100, 500], key="apercu_taille")
+            numero = col2.number_input("Page", min_value=1, value=1, key="apercu_page")
+            tri = col3.selectbox("Trier par", [""] + noms_colonnes, key="apercu_tri")
+            decroissant = col4.checkbox("Décroissant", key="apercu_decroissant")
+
+            col1, col2, col3 = st.columns(3)
+            colonne_filtre = col1.selectbox("Filtrer sur", [""] + noms_colonnes, key="apercu_filtre")
+            operateur = col2.selectbox("Condition", OPERATEURS, key="apercu_operateur")
+            valeur = col3.text_input("Valeur", key="apercu_valeur")
+            filtres = [(colonne_filtre, operateur, valeur)] if colonne_filtre and valeur else []
+
+            try:
+                page_df, total = lire_page(os.path.join(UPLOAD_DIR, apercu_fichier), (numero - 1) * lignes_par_page,
+                                          lignes_par_page, tri or None, decroissant, filtres)
+                nbre_pages = max(1, -(-total // lignes_par_page))
+                st.write(f"Page {numero} / {nbre_pages} ({total} lignes)")
+                st.dataframe(page_df)
+
+                # galerie des annonces de la page: les vignettes sont lues dans le magasin local,
+                # seules les images jamais vues sont téléchargées (en parallèle)
+                image = colonne_image(page_df.columns)
+                if image is not None and st.checkbox("🖼️ Afficher les vignettes", key="apercu_galerie"):
+                    chemins = magasin_vignettes().chemins(page_df[image].tolist())
+                    prix = next((colonne for colonne in page_df.columns if str(colonne).lower() in COLONNES_PRIX), None)
+                    galerie = [(chemin, f"{page_df[prix].iloc[i]} CFA" if prix else "") for i, chemin in enumerate(chemins) if chemin]
+                    if galerie:
+                        images, legendes = zip(*galerie)
+                        st.image(list(images), caption=list(legendes), width=160)
+                    else:
+                        st.write("*Aucune image n'a pu être récupérée pour cette page.*")
+            except Exception as e:
+                st.error(f"Erreur lors de la lecture du fichier")
+
     else:
         st.write("*Aucun fichier n'a encore été sauvegardé.*")
 
+    # suivi des annonces à travers les scrapings successifs
+    resume = historique().resume()
+    if resume["annonces"]:
+        st.subheader("Suivi des annonces")
+        st.write(f"{resume['annonces']} annonces distinctes, {resume['changements']} changement(s) de prix enregistré(s).")
+        variations = historique().variations()
+        if not variations.empty:
+            st.write("Derniers changements de prix: ")
+            st.dataframe(variations)
+
+# Diagnostics: mesures cumulées des scrapings depuis le démarrage (ou la dernière remise à zéro)
+elif st.session_state.selected_page == "Diagnostics":
+    st.title("Diagnostics du scraping")
+    instantane = mesures_globales().instantane()
+    compteurs = instantane["compteurs"]
+
+    def total(nom):
+        return sum(point["valeur"] for point in compteurs.get(nom, []))
+
+    col1, col2, col3, col4 = st.columns(4)
+    taux = instantane["taux_cache"]
+    col1.metric("Requêtes", total("streamdata_requetes_total"))
+    col2.metric("Taux de cache", f"{taux:.0%}" if taux is not None else "-")
+    col3.metric("Annonces extraites", total("streamdata_annonces_extraites_total"))
+    col4.metric("Annonces ignorées", total("streamdata_annonces_ignorees_total"))
+    st.write(f"{total('streamdata_reessais_total')} nouvelle(s) tentative(s), "
+             f"{total('streamdata_octets_telecharges_total') / 1024:.0f} Ko téléchargés.")
+
+    if not compteurs:
+        st.write("*Aucune mesure pour le moment: lancez un scraping.*")
+
+    requetes = compteurs.get("streamdata_requetes_total", [])
+    if requetes:
+        st.subheader("Requêtes par hôte et statut")
+        st.dataframe(pd.DataFrame([{**point["etiquettes"], "requêtes": point["valeur"]} for point in requetes]))
+
+    ignorees = compteurs.get("streamdata_annonces_ignorees_total", [])
+    if ignorees:
+        st.subheader("Annonces ignorées par motif")
+        st.dataframe(pd.DataFrame([{"motif": point["etiquettes"].get("motif"), "annonces": point["valeur"]} for point in ignorees])
+                     .sort_values("annonces", ascending=False).reset_index(drop=True))
+
+    for nom, titre, etiquette in (("streamdata_latence_requete_secondes", "Latence des requêtes", "hote"),
+                                  ("streamdata_analyse_secondes", "Temps d'analyse par étape", "etape")):
+        series = instantane["histogrammes"].get(nom, [])
+        if not series:
+            continue
+        st.subheader(titre)
+        st.dataframe(pd.DataFrame([{
+            etiquette: serie["etiquettes"].get(etiquette), "nombre": serie["nombre"],
+            "moyenne (s)": serie["somme"] / serie["nombre"] if serie["nombre"] else None,
+            "p50 (s) ≤": serie["p50"], "p95 (s) ≤": serie["p95"],
+        } for serie in series]))
+        # répartition par intervalle de durée, toutes séries confondues
+        comptes = [sum(valeurs) for valeurs in zip(*(serie["comptes"] for serie in series))]
+        libelles = [f"≤ {borne}" for borne in series[0]["bornes"]] + ["plus"]
+        fig, ax = plt.subplots()
+        ax.bar(libelles, comptes)
+        ax.set_xlabel("Durée (s)")
+        ax.set_ylabel("Effectif")
+        plt.xticks(rotation=45)
+        st.pyplot(fig)
+
+    col1, col2, col3 = st.columns(3)
+    col1.download_button("⬇️ JSON", data=mesures_globales().json(), file_name="mesures.json", mime="application/json")
+    col2.download_button("⬇️ Prometheus", data=mesures_globales().prometheus(), file_name="mesures.prom", mime="text/plain")
+    if col3.button("Remettre à zéro"):
+        mesures_globales().reinitialiser()
+        st.rerun()
+
 # La page Feedback permet aux utilisateurs de donner une note à l'appli
 elif st.session_state.selected_page == "Feedback":
     st.title("Aider nous à améliorer notre application")
@@ -0,0 +1,171 @@
+import json
+import math
+import os
+import threading
+import time
+
+from cache_http import DOSSIER_CACHE
+
+# bornes des histogrammes, en secondes
+BORNES_LATENCE = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BORNES_ANALYSE = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+DESCRIPTIONS = {
+    "streamdata_requetes_total": ("counter", "Requêtes par hôte et statut (cache = page fraîche du cache)"),
+    "streamdata_reessais_total": ("counter", "Nouvelles tentatives après 429, 5xx ou erreur réseau"),
+    "streamdata_octets_telecharges_total": ("counter", "Octets de HTML téléchargés (hors cache)"),
+    "streamdata_latence_requete_secondes": ("histogram", "Latence des requêtes réseau"),
+    "streamdata_analyse_secondes": ("histogram", "Temps de parsing d'une page, par étape"),
+    "streamdata_annonces_extraites_total": ("counter", "Annonces extraites, par catégorie"),
+    "streamdata_annonces_ignorees_total": ("counter", "Annonces ignorées, par motif"),
+    "streamdata_debit_requetes_par_seconde": ("gauge", "Débit courant du contrôleur, par hôte"),
+    "streamdata_images_total": ("counter", "Images téléchargées pour les vignettes, par hôte et statut"),
+}
+
+
+class Histogramme:
+    def __init__(self, bornes):
+        self.bornes = bornes
+        self.comptes = [0] * (len(bornes) + 1)
+        self.somme = 0.0
+        self.nombre = 0
+
+    def observer(self, valeur):
+        i = next((i for i, borne in enumerate(self.bornes) if valeur <= borne), len(self.bornes))
+        self.comptes[i] += 1
+        self.somme += valeur
+        self.nombre += 1
+
+    def quantile(self, q):
+        """Quantile approché: borne supérieure de l'intervalle qui le contient."""
+        if not self.nombre:
+            return None
+        rang, cumul = q * self.nombre, 0
+        for borne, compte in zip(self.bornes + (math.inf,), self.comptes):
+            cumul += compte
+            if cumul >= rang:
+                return borne
+        return math.inf
+
+
+def _borne(valeur):
+    # JSON n'a pas d'infini: même notation que Prometheus
+    return "+Inf" if valeur == math.inf else valeur
+
+
+def _etiquettes(etiquettes):
+    return tuple(sorted(etiquettes.items()))
+
+
+def _format_etiquettes(etiquettes, supplement=()):
+    paires = list(etiquettes) + list(supplement)
+    if not paires:
+        return ""
+    echappees = (
+        nom + '="' + str(valeur).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for nom, valeur in paires
+    )
+    return "{" + ",".join(echappees) + "}"
+
+
+# mesures du scraping (compteurs, jauges, histogrammes avec étiquettes), partagées par
+# les threads du crawler; exportables en JSON ou au format texte de Prometheus
+class Mesures:
+    def __init__(self):
+        self.verrou = threading.Lock()
+        self.reinitialiser()
+
+    def reinitialiser(self):
+        with self.verrou:
+            self.compteurs = {}
+            self.jauges = {}
+            self.histogrammes = {}
+            self.depuis = time.time()
+
+    def incrementer(self, nom, valeur=1, **etiquettes):
+        cle = _etiquettes(etiquettes)
+        with self.verrou:
+            serie = self.compteurs.setdefault(nom, {})
+            serie[cle] = serie.get(cle, 0) + valeur
+
+    def fixer(self, nom, valeur, **etiquettes):
+        with self.verrou:
+            self.jauges.setdefault(nom, {})[_etiquettes(etiquettes)] = valeur
+
+    def observer(self, nom, valeur, bornes=BORNES_LATENCE, **etiquettes):
+        cle = _etiquettes(etiquettes)
+        with self.verrou:
+            serie = self.histogrammes.setdefault(nom, {})
+            if cle not in serie:
+                serie[cle] = Histogramme(bornes)
+            serie[cle].observer(valeur)
+
+    def taux_cache(self):
+        """Part des requêtes servies par le cache (copie fraîche ou revalidée par un 304), ou None si aucune requête."""
+        with self.verrou:
+            serie = self.compteurs.get("streamdata_requetes_total", {})
+            total = sum(serie.values())
+            cache = sum(v for cle, v in serie.items() if dict(cle).get("statut") in ("cache", "revalide"))
+        return cache / total if total else None
+
+    def instantane(self):
+        """Toutes les mesures sous forme de dictionnaire sérialisable en JSON."""
+        with self.verrou:
+            resultat = {
+                "depuis": self.depuis,
+                "compteurs": {nom: [{"etiquettes": dict(cle), "valeur": v} for cle, v in serie.items()]
+                              for nom, serie in self.compteurs.items()},
+                "jauges": {nom: [{"etiquettes": dict(cle), "valeur": v} for cle, v in serie.items()]
+                           for nom, serie in self.jauges.items()},
+                "histogrammes": {
+                    nom: [{
+                        "etiquettes": dict(cle), "nombre": h.nombre, "somme": h.somme,
+                        "bornes": list(h.bornes), "comptes": list(h.comptes),
+                        "p50": _borne(h.quantile(0.5)), "p95": _borne(h.quantile(0.95)),
+                    } for cle, h in serie.items()]
+                    for nom, serie in self.histogrammes.items()
+                },
+            }
+        resultat["taux_cache"] = self.taux_cache()
+        return resultat
+
+    def json(self):
+        return json.dumps(self.instantane(), ensure_ascii=False, indent=2, default=str)
+
+    def prometheus(self):
+        """Exposition au format texte de Prometheus."""
+        lignes = []
+        with self.verrou:
+            series = [(nom, serie) for nom, serie in self.compteurs.items()] + \
+                     [(nom, serie) for nom, serie in self.jauges.items()]
+            for nom, serie in series:
+                type_mesure, aide = DESCRIPTIONS.get(nom, ("untyped", nom))
+                lignes += [f"# HELP {nom} {aide}", f"# TYPE {nom} {type_mesure}"]
+                lignes += [f"{nom}{_format_etiquettes(cle)} {valeur}" for cle, valeur in serie.items()]
+            for nom, serie in self.histogrammes.items():
+                lignes += [f"# HELP {nom} {DESCRIPTIONS.get(nom, ('', nom))[1]}", f"# TYPE {nom} histogram"]
+                for cle, h in serie.items():
+                    cumul = 0
+                    for borne, compte in zip(h.bornes + (math.inf,), h.comptes):
+                        cumul += compte
+                        le = "+Inf" if borne == math.inf else str(borne)
+                        lignes.append(f"{nom}_bucket{_format_etiquettes(cle, [('le', le)])} {cumul}")
+                    lignes.append(f"{nom}_sum{_format_etiquettes(cle)} {h.somme}")
+                    lignes.append(f"{nom}_count{_format_etiquettes(cle)} {h.nombre}")
+        return "\n".join(lignes) + "\n"
+
+    def exporter(self, dossier=DOSSIER_CACHE):
+        """Écrit mesures.json et mesures.prom (lisible par le textfile collector de node_exporter)."""
+        os.makedirs(dossier, exist_ok=True)
+        for nom, contenu in (("mesures.json", self.json()), ("mesures.prom", self.prometheus())):
+            chemin = os.path.join(dossier, nom)
+            with open(chemin + ".part", "w", encoding="utf-8") as f:
+                f.write(contenu)
+            os.replace(chemin + ".part", chemin)
+
+
+_mesures = Mesures()
+
+def mesures_globales():
+    """Renvoie les mesures communes à tous les scrapings du processus."""
+    return _mesures
@@ -0,0 +1,287 @@
+import asyncio
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+
+from client_http import client_partage
+from mesures import BORNES_ANALYSE, mesures_globales
+
+
+# statuts qui signifient « ralentissez »: on réessaie après une pause
+STATUTS_SURCHARGE = (429, 500, 502, 503, 504)
+
+
+def duree_retry_after(valeur):
+    """Convertit un en-tête Retry-After (secondes ou date HTTP) en secondes, ou None."""
+    if not valeur:
+        return None
+    try:
+        return max(0.0, float(valeur))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(valeur) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def attente_backoff(essai, base=0.5, plafond=30.0):
+    """Backoff exponentiel avec gigue complète: les clients ne réessaient pas tous en même temps."""
+    return random.uniform(0, min(plafond, base * 2 ** essai))
+
+
+class BudgetEpuise(Exception):
+    pass
+
+
+# budget d'un crawl: nombre de requêtes, volume téléchargé et durée maximum (None = illimité)
+class BudgetCrawl:
+    def __init__(self, requetes_max=None, octets_max=None, duree_max=None):
+        self.requetes_max = requetes_max
+        self.octets_max = octets_max
+        self.duree_max = duree_max
+        self.requetes = 0
+        self.octets = 0
+        self.debut = time.monotonic()
+
+    def reserver(self):
+        """Compte une requête, ou lève BudgetEpuise si une limite est atteinte."""
+        if self.requetes_max is not None and self.requetes >= self.requetes_max:
+            raise BudgetEpuise(f"budget de {self.requetes_max} requêtes atteint")
+        if self.octets_max is not None and self.octets >= self.octets_max:
+            raise BudgetEpuise(f"budget de {self.octets_max} octets atteint")
+        if self.duree_max is not None and time.monotonic() - self.debut >= self.duree_max:
+            raise BudgetEpuise(f"budget de {self.duree_max} secondes atteint")
+        self.requetes += 1
+
+    def consommer(self, octets):
+        self.octets += octets
+
+
+# débit adaptatif par hôte: seau à jetons dont le débit augmente doucement tant que
+# l'hôte répond vite, et est divisé par deux sur 429 / 5xx ou quand la latence se dégrade
+# (augmentation additive, diminution multiplicative)
+class ControleurDebit:
+    def __init__(self, requetes_par_seconde, debit_min=0.2, debit_max=None, rafale=2):
+        self.debit = requetes_par_seconde
+        self.debit_min = min(debit_min, requetes_par_seconde)
+        self.debit_max = debit_max or 2 * requetes_par_seconde
+        self.rafale = rafale
+        self.jetons = 1.0
+        self.dernier_remplissage = time.monotonic()
+        self.pause_jusqua = 0.0
+        self.derniere_baisse = 0.0
+        self.latence_reference = None
+        self.latence_moyenne = None
+        self.verrou = asyncio.Lock()
+
+    def _remplir(self, maintenant):
+        self.jetons = min(self.rafale, self.jetons + (maintenant - self.dernier_remplissage) * self.debit)
+        self.dernier_remplissage = maintenant
+
+    async def attendre(self):
+        """Attend un jeton (et la fin d'une éventuelle pause imposée par l'hôte)."""
+        while True:
+            async with self.verrou:
+                maintenant = time.monotonic()
+                self._remplir(maintenant)
+                if maintenant >= self.pause_jusqua and self.jetons >= 1:
+                    self.jetons -= 1
+                    return
+                attente = max(self.pause_jusqua - maintenant, (1 - self.jetons) / self.debit)
+            await asyncio.sleep(attente)
+
+    def _baisser(self, facteur):
+        # les requêtes déjà parties échouent ensemble: une seule baisse par intervalle
+        maintenant = time.monotonic()
+        if maintenant - self.derniere_baisse >= 1 / self.debit:
+            self._remplir(maintenant)
+            self.debit = max(self.debit_min, self.debit * facteur)
+            self.derniere_baisse = maintenant
+
+    def succes(self, latence):
+        self.latence_moyenne = latence if self.latence_moyenne is None else 0.8 * self.latence_moyenne + 0.2 * latence
+        self.latence_reference = latence if self.latence_reference is None else min(self.latence_reference, latence)
+        if self.latence_moyenne > max(3 * self.latence_reference, 1.0):
+            # l'hôte commence à peiner: on ralentit avant qu'il ne refuse
+            self._baisser(0.8)
+        else:
+            self._remplir(time.monotonic())
+            self.debit = min(self.debit_max, self.debit + 0.1 / self.debit)
+
+    def surcharge(self, essai, retry_after=None):
+        """429 / 5xx / erreur réseau: débit divisé par deux et pause de tout l'hôte."""
+        self._baisser(0.5)
+        pause = retry_after if retry_after is not None else attente_backoff(essai)
+        self.pause_jusqua = max(self.pause_jusqua, time.monotonic() + pause)
+
+
+# moteur de crawl asynchrone: les requêtes bloquantes tournent dans un pool de threads
+# borné; le débit par hôte s'adapte aux réponses et un budget peut borner le crawl.
+# ttl fixe la fraîcheur exigée des pages en cache quand fetch n'en précise pas (None: celle du cache)
+class Crawler:
+    def __init__(self, concurrence=8, requetes_par_seconde=4.0, client=None, budget=None, essais=3, mesures=None, ttl=None):
+        self.concurrence = concurrence
+        self.ttl = ttl
+        self.requetes_par_seconde = requetes_par_seconde
+        self.client = client or client_partage()
+        self.budget = budget
+        self.mesures = mesures or mesures_globales()
+        self.essais = essais
+        self.controleurs = {}
+        self.semaphore = None
+        self.executor = None
+
+    async def __aenter__(self):
+        self.semaphore = asyncio.Semaphore(self.concurrence)
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrence)
+        self.controleurs = {}
+        return self
+
+    async def __aexit__(self, *exc):
+        self.executor.shutdown(wait=False)
+        self.executor = None
+
+    def controleur(self, url):
+        hote = urlparse(url).netloc
+        if hote not in self.controleurs:
+            self.controleurs[hote] = ControleurDebit(self.requetes_par_seconde)
+        return self.controleurs[hote]
+
+    async def fetch(self, url, ttl=None):
+        """Télécharge une page et renvoie son contenu HTML, en réessayant sur 429 / 5xx."""
+        loop = asyncio.get_running_loop()
+        ttl = self.ttl if ttl is None else ttl
+        # une page fraîche du cache ne coûte ni jeton ni budget
+        texte = await loop.run_in_executor(self.executor, self.client.en_cache, url, ttl)
+        if texte is not None:
+            self.mesures.incrementer("streamdata_requetes_total", hote=urlparse(url).netloc, statut="cache")
+            return texte
+        return await self._telecharger(url, self.client.lire_page, url, ttl)
+
+    async def fetch_octets(self, url):
+        """Télécharge une ressource binaire (une image) avec le même débit et les mêmes reprises que les pages."""
+        return await self._telecharger(url, self._lire_octets, url)
+
+    def _lire_octets(self, url):
+        contenu = self.client.get_octets(url)
+        return contenu, "ok", len(contenu)
+
+    # lire renvoie (contenu, statut, octets reçus): une page revalidée (304) est comptée à part,
+    # sans octets, puisque son contenu vient du cache
+    async def _telecharger(self, url, lire, *args):
+        loop = asyncio.get_running_loop()
+        hote = urlparse(url).netloc
+        controleur = self.controleur(url)
+        for essai in range(self.essais + 1):
+            async with self.semaphore:
+                await controleur.attendre()
+                if self.budget is not None:
+                    self.budget.reserver()
+                debut = time.monotonic()
+                try:
+                    contenu, statut, octets = await loop.run_in_executor(self.executor, lire, *args)
+                except requests.HTTPError as e:
+                    reponse = e.response
+                    statut = reponse.status_code if reponse is not None else "erreur http"
+                    self._compter(hote, statut, debut)
+                    if reponse is None or statut not in STATUTS_SURCHARGE or essai == self.essais:
+                        raise
+                    controleur.surcharge(essai, duree_retry_after(reponse.headers.get("Retry-After")))
+                    self._reessai(hote, statut, controleur)
+                    continue
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    self._compter(hote, type(e).__name__, debut)
+                    if essai == self.essais:
+                        raise
+                    controleur.surcharge(essai)
+                    self._reessai(hote, type(e).__name__, controleur)
+                    continue
+            latence = self._compter(hote, statut, debut)
+            controleur.succes(latence)
+            self.mesures.incrementer("streamdata_octets_telecharges_total", octets, hote=hote)
+            self.mesures.fixer("streamdata_debit_requetes_par_seconde", controleur.debit, hote=hote)
+            if self.budget is not None:
+                self.budget.consommer(octets)
+            return contenu
+
+    def _compter(self, hote, statut, debut):
+        latence = time.monotonic() - debut
+        self.mesures.incrementer("streamdata_requetes_total", hote=hote, statut=statut)
+        self.mesures.observer("streamdata_latence_requete_secondes", latence, hote=hote)
+        return latence
+
+    def _reessai(self, hote, motif, controleur):
+        self.mesures.incrementer("streamdata_reessais_total", hote=hote, motif=motif)
+        self.mesures.fixer("streamdata_debit_requetes_par_seconde", controleur.debit, hote=hote)
+
+    async def fetch_all(self, urls, ttl=None):
+        """Télécharge plusieurs pages en parallèle, les erreurs sont renvoyées telles quelles."""
+        return await asyncio.gather(*(self.fetch(url, ttl) for url in urls), return_exceptions=True)
+
+
+# étage d'analyse découplé du téléchargement: les pages html sont déposées dans une
+# file bornée et transformées en enregistrements; par défaut dans le processus courant
+# (quelques ms par page), avec processus > 0 (ou None, un par coeur) dans un pool spawn
+# qui répartit le parsing sur plusieurs coeurs mais coûte plusieurs secondes à démarrer:
+# à réserver aux très gros crawls dont le parsing sature un coeur
+class EtageAnalyse:
+    def __init__(self, processus=0, taille_file=64, mesures=None):
+        self.processus = os.cpu_count() if processus is None else processus
+        self.taille_file = taille_file
+        self.mesures = mesures or mesures_globales()
+        self.file = None
+        self.executor = None
+        self.consommateurs = []
+
+    async def __aenter__(self):
+        self.file = asyncio.Queue(maxsize=self.taille_file)
+        if self.processus:
+            # spawn: pas de fork d'un processus qui contient déjà des threads
+            self.executor = ProcessPoolExecutor(self.processus, mp_context=multiprocessing.get_context("spawn"))
+        self.consommateurs = [asyncio.ensure_future(self._consommer()) for _ in range(max(self.processus, 1))]
+        return self
+
+    async def __aexit__(self, *exc):
+        for consommateur in self.consommateurs:
+            consommateur.cancel()
+        await asyncio.gather(*self.consommateurs, return_exceptions=True)
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    async def _consommer(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            fonction, args, resultat = await self.file.get()
+            debut = time.monotonic()
+            try:
+                if self.executor is None:
+                    valeur = fonction(*args)
+                else:
+                    valeur = await loop.run_in_executor(self.executor, fonction, *args)
+            except Exception as e:
+                if not resultat.done():
+                    resultat.set_exception(e)
+            else:
+                if not resultat.done():
+                    resultat.set_result(valeur)
+            finally:
+                # temps d'analyse d'une page, sans l'attente dans la file
+                self.mesures.observer("streamdata_analyse_secondes", time.monotonic() - debut,
+                                      BORNES_ANALYSE, etape=fonction.__name__)
+                self.file.task_done()
+
+    async def analyser(self, fonction, *args):
+        """Soumet une fonction d'extraction (importable, donc sérialisable) et attend son résultat."""
+        resultat = asyncio.get_running_loop().create_future()
+        # file pleine: le téléchargeur attend que les analyseurs rattrapent leur retard
+        await self.file.put((fonction, args, resultat))
+        return await resultat
@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+
+# noms de colonnes reconnus (en minuscules), sites scrapés et fichiers chargés confondus
+COLONNES_PRIX = ("prix", "price")
+COLONNES_SURFACE = ("superficie", "surface")
+COLONNES_PIECES = ("nombre pieces", "nbr_pieces", "pieces", "pièces")
+COLONNES_SALLES_BAIN = ("nbr_salle_bain", "salles de bain", "salle_bain")
+COLONNES_ADRESSE = ("adresse", "address", "localisation")
+
+# au-delà, un « nombre de pièces » est en fait une surface décalée d'une colonne
+PIECES_MAX = 30
+# au-delà de 100 ha, la « surface » est presque toujours un prix mal placé
+SURFACE_MAX = 1_000_000
+
+# espaces, y compris insécables (le moteur regex d'arrow ne connaît pas les échappements \u)
+ESPACES = "[\\s\u00a0\u202f]"
+
+
+def _colonne(df, noms):
+    return next((colonne for colonne in df.columns if str(colonne).lower() in noms), None)
+
+
+def _texte(serie):
+    """Valeurs en texte nettoyé; vide et « nan » deviennent manquants."""
+    texte = serie.astype("string").str.strip()
+    return texte.mask(texte.str.lower().isin(["", "nan", "none", "null"]))
+
+
+def _ressemble_surface(texte):
+    nombres = pd.to_numeric(texte, errors="coerce")
+    return texte.str.contains(r"m2|m²|ha", case=False, na=False) | (nombres > PIECES_MAX)
+
+
+def lire_prix(serie):
+    """Prix en nombre: « 25 000 000 CFA », « 25.000.000 », « 25000000.0 »; « sur demande » est manquant."""
+    texte = _texte(serie).str.lower()
+    texte = texte.mask(texte.str.contains("demande", na=False))
+    texte = texte.str.replace(r"f?\s*cfa|xof|" + ESPACES, "", regex=True)
+    # points ou virgules séparateurs de milliers
+    milliers = texte.str.fullmatch(r"\d{1,3}(?:[.,]\d{3})+", na=False)
+    texte = texte.mask(milliers, texte.str.replace(r"[.,]", "", regex=True))
+    return pd.to_numeric(texte.str.replace(",", ".", regex=False), errors="coerce"), texte.notna()
+
+
+def lire_surface(serie):
+    """Surface en m²: « 800 m2 », « 1 000 », « 1,5 ha »."""
+    texte = _texte(serie).str.lower()
+    morceaux = texte.str.replace(ESPACES, "", regex=True).str.extract(r"^(\d+(?:[.,]\d+)?)(m2|m²|m|ha)?$")
+    valeurs = pd.to_numeric(morceaux[0].str.replace(",", ".", regex=False), errors="coerce")
+    valeurs = valeurs.mask((morceaux[1] == "ha").fillna(False).astype(bool), valeurs * 10_000)
+    return valeurs, texte.notna()
+
+
+def lire_entier(serie):
+    texte = _texte(serie)
+    valeurs = pd.to_numeric(texte.str.extract(r"^(\d+)(?:\.0+)?$")[0], errors="coerce")
+    return valeurs.astype("Int64"), texte.notna()
+
+
+def decouper_adresse(serie):
+    """« Fann, Dakar, Sénégal » -> ville Fann, région Dakar; « Mbour, Sénégal » -> ville et région Mbour."""
+    parties = _texte(serie).str.split(r"\s*,\s*", regex=True)
+    nombre = parties.str.len()
+    ville = parties.str[0].where(nombre > 1)
+    region = parties.str[-2].where(nombre > 1)
+    return ville.astype("category"), region.astype("category")
+
+
+def realigner(df):
+    """Remet à sa place une surface décalée dans les colonnes pièces / salles de bain
+    (pages où la surface manque: les valeurs suivantes glissent d'une colonne)."""
+    surface = _colonne(df, COLONNES_SURFACE)
+    if surface is None:
+        return df
+    df = df.copy()
+    for colonne in (_colonne(df, COLONNES_SALLES_BAIN), _colonne(df, COLONNES_PIECES)):
+        if colonne is None:
+            continue
+        texte = _texte(df[colonne])
+        decalees = _texte(df[surface]).isna() & _ressemble_surface(texte)
+        df[surface] = df[surface].astype("object").mask(decalees, texte)
+        df[colonne] = df[colonne].astype("object").mask(decalees, np.nan)
+    return df
+
+
+def normaliser(df):
+    """Type les champs connus (prix, surface, pièces, adresse) en une seule passe vectorisée.
+
+    Renvoie (propres, quarantaine): les lignes dont une valeur présente est illisible
+    ou hors bornes sont mises de côté avec le motif, sans bloquer le reste du fichier.
+    """
+    df = realigner(df)
+    types = df.copy()
+    motifs = pd.Series("", index=df.index, dtype="object")
+
+    def signaler(condition, motif):
+        # les comparaisons sur des valeurs manquantes ne signalent rien
+        nonlocal motifs
+        motifs = motifs.mask(condition.fillna(False).astype(bool), motifs + motif + "; ")
+
+    colonne = _colonne(df, COLONNES_PRIX)
+    if colonne is not None:
+        valeurs, presents = lire_prix(df[colonne])
+        signaler(presents & valeurs.isna(), "prix illisible")
+        signaler(valeurs <= 0, "prix hors bornes")
+        entieres = valeurs.dropna()
+        types[colonne] = valeurs.astype("Int64") if (entieres == entieres.round()).all() else valeurs
+
+    colonne = _colonne(df, COLONNES_SURFACE)
+    if colonne is not None:
+        valeurs, presents = lire_surface(df[colonne])
+        signaler(presents & valeurs.isna(), "surface illisible")
+        signaler((valeurs <= 0) | (valeurs > SURFACE_MAX), "surface hors bornes")
+        types[colonne] = valeurs
+
+    for noms, nom_motif in ((COLONNES_PIECES, "pièces"), (COLONNES_SALLES_BAIN, "salles de bain")):
+        colonne = _colonne(df, noms)
+        if colonne is not None:
+            valeurs, presents = lire_entier(df[colonne])
+            signaler(presents & valeurs.isna(), f"{nom_motif} illisible")
+            signaler((valeurs < 0) | (valeurs > PIECES_MAX), f"{nom_motif} hors bornes")
+            types[colonne] = valeurs
+
+    colonne = _colonne(df, COLONNES_ADRESSE)
+    if colonne is not None:
+        ville, region = decouper_adresse(df[colonne])
+        types[colonne] = _texte(df[colonne]).astype("category")
+        if "ville" not in types.columns and "region" not in types.columns:
+            types["ville"], types["region"] = ville, region
+
+    rejetees = motifs != ""
+    quarantaine = df[rejetees].assign(motif=motifs[rejetees].str.rstrip("; "))
+    return types[~rejetees].reset_index(drop=True), quarantaine.reset_index(drop=True)
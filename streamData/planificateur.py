@@ -0,0 +1,150 @@
+# planificateur des scrapings récurrents, sans l'interface Streamlit
+# usage: python planificateur.py [--config planification.json] [--max-concurrence 2]
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+from historique import HistoriqueAnnonces
+from taches import GestionnaireTaches, EN_ATTENTE, EN_COURS
+
+DOSSIER_SORTIE = "update_files"
+
+# bornes des 5 champs cron: minute, heure, jour du mois, mois, jour de la semaine
+BORNES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 6)]
+
+
+def lire_champ(champ, minimum, maximum):
+    """Convertit un champ cron (*, */n, a-b, a-b/n, listes) en ensemble de valeurs."""
+    valeurs = set()
+    for partie in champ.split(","):
+        plage, _, pas = partie.partition("/")
+        pas = int(pas) if pas else 1
+        if plage == "*":
+            debut, fin = minimum, maximum
+        elif "-" in plage:
+            debut, fin = (int(v) for v in plage.split("-"))
+        else:
+            debut = fin = int(plage)
+        if debut < minimum or fin > maximum or debut > fin or pas < 1:
+            raise ValueError(f"champ cron invalide: {champ}")
+        valeurs.update(range(debut, fin + 1, pas))
+    return valeurs
+
+
+class ExpressionCron:
+    def __init__(self, expression):
+        champs = expression.split()
+        if len(champs) != 5:
+            raise ValueError(f"une expression cron a 5 champs: {expression}")
+        self.expression = expression
+        self.minutes, self.heures, self.jours, self.mois, self.jours_semaine = (
+            lire_champ(champ, *bornes) for champ, bornes in zip(champs, BORNES)
+        )
+        # comme cron: quand le jour du mois et le jour de la semaine sont tous deux
+        # restreints, il suffit que l'un des deux corresponde (« 0 6 1 * 1 »: le 1er et chaque lundi)
+        self.jours_restreints = not champs[2].startswith("*") and not champs[4].startswith("*")
+
+    def correspond(self, moment):
+        # en cron le dimanche vaut 0, en python weekday() vaut 6
+        jour = moment.day in self.jours
+        jour_semaine = (moment.weekday() + 1) % 7 in self.jours_semaine
+        jour_ok = (jour or jour_semaine) if self.jours_restreints else (jour and jour_semaine)
+        return (moment.minute in self.minutes and moment.hour in self.heures
+                and moment.month in self.mois and jour_ok)
+
+
+class Planification:
+    # ttl: âge maximal des pages d'annonce reprises du cache; 0 par défaut, un suivi de prix
+    # relancé toutes les heures ne doit pas relire des prix vieux de plusieurs heures
+    def __init__(self, nom, cron, categorie, nbre_pages=1, incremental=False, ttl=0):
+        self.nom = nom
+        self.ttl = ttl
+        self.cron = ExpressionCron(cron)
+        self.categorie = categorie
+        self.nbre_pages = nbre_pages
+        self.incremental = incremental
+
+
+def charger_planifications(chemin):
+    with open(chemin, encoding="utf-8") as f:
+        return [Planification(**entree) for entree in json.load(f)]
+
+
+# déclenche les planifications à chaque minute correspondante, en s'appuyant sur le
+# gestionnaire de tâches; une planification dont l'exécution précédente tourne encore
+# est sautée, et le nombre de scrapings simultanés est plafonné
+class Planificateur:
+    def __init__(self, planifications, max_concurrence=2, dossier=DOSSIER_SORTIE, gestionnaire=None):
+        self.planifications = planifications
+        self.max_concurrence = max_concurrence
+        self.dossier = dossier
+        self.gestionnaire = gestionnaire or GestionnaireTaches(workers=max_concurrence, historique=HistoriqueAnnonces())
+        self.en_cours = {}
+
+    def actif(self, nom):
+        id_tache = self.en_cours.get(nom)
+        if id_tache is None:
+            return False
+        tache = self.gestionnaire.tache(id_tache)
+        return tache is not None and tache["statut"] in (EN_ATTENTE, EN_COURS)
+
+    def declencher(self, planification, moment):
+        if self.actif(planification.nom):
+            print(f"[{moment:%H:%M}] {planification.nom}: exécution précédente en cours, ignorée")
+            return None
+        if sum(self.actif(nom) for nom in self.en_cours) >= self.max_concurrence:
+            print(f"[{moment:%H:%M}] {planification.nom}: limite de {self.max_concurrence} scrapings atteinte, ignorée")
+            return None
+
+        # en mode incrémental on complète toujours le même fichier, sinon un instantané horodaté
+        if planification.incremental:
+            nom_fichier = f"{planification.nom}.csv"
+        else:
+            nom_fichier = f"{planification.nom}_{moment:%Y%m%d_%H%M}.csv"
+        chemin = os.path.join(self.dossier, nom_fichier)
+        try:
+            id_tache = self.gestionnaire.soumettre(
+                planification.categorie, planification.nbre_pages, chemin, planification.incremental, ttl=planification.ttl)
+        except ValueError as e:
+            print(f"[{moment:%H:%M}] {planification.nom}: {e}, ignorée")
+            return None
+        self.en_cours[planification.nom] = id_tache
+        print(f"[{moment:%H:%M}] {planification.nom}: scraping n°{id_tache} vers {chemin}")
+        return id_tache
+
+    def verifier(self, moment):
+        """Déclenche les planifications qui correspondent à la minute donnée."""
+        for planification in self.planifications:
+            if planification.cron.correspond(moment):
+                self.declencher(planification, moment)
+
+    def executer(self):
+        os.makedirs(self.dossier, exist_ok=True)
+        derniere = datetime.now().replace(second=0, microsecond=0)
+        while True:
+            time.sleep(60 - datetime.now().second)
+            maintenant = datetime.now().replace(second=0, microsecond=0)
+            # rattrape les minutes sautées si la machine a été suspendue un moment
+            while derniere < maintenant:
+                derniere += timedelta(minutes=1)
+                self.verifier(derniere)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrapings récurrents de StreamData")
+    parser.add_argument("--config", default="planification.json")
+    parser.add_argument("--max-concurrence", type=int, default=2)
+    parser.add_argument("--dossier", default=DOSSIER_SORTIE)
+    args = parser.parse_args()
+
+    planifications = charger_planifications(args.config)
+    for planification in planifications:
+        print(f"{planification.nom}: {planification.cron.expression} -> {planification.categorie}, "
+              f"{planification.nbre_pages} pages")
+    Planificateur(planifications, args.max_concurrence, args.dossier).executer()
+
+
+if __name__ == "__main__":
+    main()
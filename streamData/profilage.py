@@ -0,0 +1,177 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from normalisation import normaliser
+from stockage import a_jour, chemin_colonnaire, chemin_quarantaine, dialecte_csv
+
+TAILLE_MORCEAU = 100_000
+
+
+def iter_morceaux(chemin, taille=TAILLE_MORCEAU, copie=True):
+    """Lit un fichier par morceaux de `taille` lignes, toutes les colonnes en texte.
+
+    Un fichier déjà converti est lu depuis sa copie parquet: les lignes et les types sont
+    alors ceux de la copie normalisée, les mêmes que pour les graphes et l'analyse
+    (copie=False force la lecture de la source).
+    """
+    if copie and a_jour(chemin):
+        # la copie parquet évite aussi de repasser par openpyxl pour un classeur
+        for lot in pq.ParquetFile(chemin_colonnaire(chemin)).iter_batches(batch_size=taille):
+            yield lot.to_pandas().astype("string")
+    elif chemin.endswith(".xlsx"):
+        from openpyxl import load_workbook
+
+        classeur = load_workbook(chemin, read_only=True)
+        lignes = classeur.active.iter_rows(values_only=True)
+        entete = [str(c) for c in next(lignes, [])]
+        morceau = []
+        for ligne in lignes:
+            morceau.append(ligne)
+            if len(morceau) == taille:
+                yield pd.DataFrame(morceau, columns=entete).astype("string")
+                morceau = []
+        if morceau:
+            yield pd.DataFrame(morceau, columns=entete).astype("string")
+        classeur.close()
+    else:
+        yield from pd.read_csv(chemin, chunksize=taille, dtype="string", **dialecte_csv(chemin))
+
+
+def apercu_debut(chemin, n=5):
+    """Renvoie les n premières lignes sans lire le reste du fichier."""
+    return next(iter_morceaux(chemin, n), pd.DataFrame())
+
+
+# estimation du nombre de valeurs distinctes en mémoire constante (HyperLogLog)
+class HyperLogLog:
+    def __init__(self, precision=14):
+        self.p = precision
+        self.m = 1 << precision
+        self.registres = np.zeros(self.m, dtype=np.uint8)
+
+    def ajouter(self, serie):
+        if serie.empty:
+            return
+        h = pd.util.hash_pandas_object(serie, index=False).to_numpy(dtype=np.uint64)
+        indices = (h >> np.uint64(64 - self.p)).astype(np.int64)
+        reste = h & np.uint64((1 << (64 - self.p)) - 1)
+        # rang = position du premier bit à 1 dans les 64-p bits restants (frexp est exact sous 2^53)
+        longueur = np.frexp(reste.astype(np.float64))[1]
+        rangs = (64 - self.p - longueur + 1).astype(np.uint8)
+        np.maximum.at(self.registres, indices, rangs)
+
+    def estimation(self):
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        brute = alpha * self.m ** 2 / np.sum(np.power(2.0, -self.registres.astype(np.float64)))
+        vides = int(np.count_nonzero(self.registres == 0))
+        if brute <= 2.5 * self.m and vides:
+            # petites cardinalités: le comptage linéaire est plus précis
+            return int(round(self.m * np.log(self.m / vides)))
+        return int(round(brute))
+
+
+# valeurs les plus fréquentes en mémoire bornée (algorithme Space-Saving): chaque
+# compteur garde l'erreur héritée de la valeur qu'il a remplacée
+class ValeursFrequentes:
+    def __init__(self, k=10, capacite=None):
+        self.k = k
+        self.capacite = capacite or k * 20
+        self.compteurs = {}
+
+    def ajouter(self, serie):
+        # seules les valeurs les plus fréquentes du morceau peuvent entrer dans le top
+        for valeur, nombre in serie.value_counts().head(self.capacite).items():
+            if valeur in self.compteurs:
+                self.compteurs[valeur][0] += nombre
+            elif len(self.compteurs) < self.capacite:
+                self.compteurs[valeur] = [nombre, 0]
+            else:
+                minimum = min(self.compteurs, key=lambda v: self.compteurs[v][0])
+                plancher = self.compteurs.pop(minimum)[0]
+                self.compteurs[valeur] = [plancher + nombre, plancher]
+
+    def resultat(self):
+        # on renvoie le nombre d'occurrences garanti (compteur moins erreur)
+        garanties = [(valeur, compte - erreur) for valeur, (compte, erreur) in self.compteurs.items()]
+        meilleures = sorted(garanties, key=lambda item: item[1], reverse=True)[:self.k]
+        return [[str(valeur), int(nombre)] for valeur, nombre in meilleures]
+
+
+class ProfilColonne:
+    def __init__(self, k=10):
+        self.non_nuls = 0
+        self.manquants = 0
+        self.numeriques = 0
+        self.entiers = 0
+        self.somme = 0.0
+        self.min = None
+        self.max = None
+        self.distincts = HyperLogLog()
+        self.frequentes = ValeursFrequentes(k)
+
+    def ajouter(self, serie):
+        presents = serie.dropna()
+        self.manquants += len(serie) - len(presents)
+        self.non_nuls += len(presents)
+        self.distincts.ajouter(presents)
+        self.frequentes.ajouter(presents)
+
+        nombres = pd.to_numeric(presents, errors="coerce").dropna().astype("float64")
+        if not nombres.empty:
+            self.numeriques += len(nombres)
+            self.entiers += int((nombres == np.floor(nombres)).sum())
+            self.somme += float(nombres.sum())
+            self.min = float(nombres.min()) if self.min is None else min(self.min, float(nombres.min()))
+            self.max = float(nombres.max()) if self.max is None else max(self.max, float(nombres.max()))
+
+    def resultat(self):
+        # une colonne est numérique si toutes ses valeurs présentes le sont
+        if self.non_nuls and self.numeriques == self.non_nuls:
+            type_infere = "entier" if self.entiers == self.numeriques else "décimal"
+        elif self.non_nuls:
+            type_infere = "texte"
+        else:
+            type_infere = "vide"
+        resultat = {
+            "type": type_infere,
+            "non_nuls": self.non_nuls,
+            "manquants": self.manquants,
+            "distincts": self.distincts.estimation(),
+            "top": self.frequentes.resultat(),
+        }
+        if type_infere in ("entier", "décimal"):
+            resultat.update(min=self.min, max=self.max, moyenne=self.somme / self.numeriques)
+        return resultat
+
+
+def _compter_lignes(chemin, taille):
+    if not os.path.exists(chemin):
+        return 0
+    return sum(len(morceau) for morceau in pd.read_csv(chemin, chunksize=taille, dtype="string"))
+
+
+def profiler(chemin, taille=TAILLE_MORCEAU, k=10, normalise=False):
+    """Profil d'un fichier en un seul passage par morceaux, sans jamais le charger entièrement.
+
+    Avec normalise=True, c'est le profil de la copie normalisée (celle des graphes), avec le
+    nombre de lignes en quarantaine: la copie est lue si elle est à jour, sinon la source est
+    normalisée morceau par morceau, sans écrire la copie.
+    """
+    lignes = quarantaine = 0
+    colonnes = {}
+    depuis_source = normalise and not a_jour(chemin)
+    for morceau in iter_morceaux(chemin, taille, copie=not depuis_source):
+        if depuis_source:
+            morceau, rejetees = normaliser(morceau)
+            quarantaine += len(rejetees)
+            morceau = morceau.astype("string")
+        lignes += len(morceau)
+        for nom in morceau.columns:
+            colonnes.setdefault(str(nom), ProfilColonne(k)).ajouter(morceau[nom])
+    profil = {"lignes": lignes, "colonnes": {nom: profil.resultat() for nom, profil in colonnes.items()}}
+    if normalise:
+        profil["quarantaine"] = quarantaine if depuis_source else _compter_lignes(chemin_quarantaine(chemin), taille)
+    return profil
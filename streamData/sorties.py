@@ -0,0 +1,106 @@
+import csv
+import os
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+# les sorties écrivent les annonces par lots dans un fichier temporaire,
+# renommé à la fermeture: un scraping vide ou interrompu n'écrase rien
+class SortieCsv:
+    def __init__(self, chemin, colonnes):
+        self.chemin = chemin
+        self.temporaire = chemin + ".part"
+        self.nbre_lignes = 0
+        self.fichier = open(self.temporaire, "w", newline="", encoding="utf-8")
+        self.writer = csv.DictWriter(self.fichier, fieldnames=colonnes, extrasaction="ignore")
+        self.writer.writeheader()
+
+    def ecrire(self, lignes):
+        self.writer.writerows(lignes)
+        self.fichier.flush()
+        self.nbre_lignes += len(lignes)
+
+    def close(self, valider=True):
+        self.fichier.close()
+        if valider and self.nbre_lignes:
+            os.replace(self.temporaire, self.chemin)
+        else:
+            os.remove(self.temporaire)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self.close(valider=exc_type is None)
+
+
+class SortieParquet:
+    def __init__(self, chemin, colonnes, taille_lot=1000):
+        self.chemin = chemin
+        self.temporaire = chemin + ".part"
+        self.colonnes = colonnes
+        self.taille_lot = taille_lot
+        self.tampon = []
+        self.writer = None
+        self.nbre_lignes = 0
+
+    def ecrire(self, lignes):
+        self.tampon.extend(lignes)
+        self.nbre_lignes += len(lignes)
+        if len(self.tampon) >= self.taille_lot:
+            self._vider()
+
+    def _vider(self):
+        if not self.tampon:
+            return
+        table = pa.Table.from_pylist(self.tampon)
+        table = table.select([c for c in self.colonnes if c in table.column_names])
+        if self.writer is None:
+            # le schéma est fixé par le premier lot, les suivants y sont convertis
+            self.writer = pq.ParquetWriter(self.temporaire, table.schema)
+        self.writer.write_table(table.cast(self.writer.schema))
+        self.tampon = []
+
+    def close(self, valider=True):
+        if valider:
+            self._vider()
+        if self.writer is not None:
+            self.writer.close()
+        if valider and self.nbre_lignes:
+            os.replace(self.temporaire, self.chemin)
+        elif os.path.exists(self.temporaire):
+            os.remove(self.temporaire)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self.close(valider=exc_type is None)
+
+
+def ajouter(chemin, df):
+    """Ajoute des lignes à la fin d'un fichier csv ou parquet, créé s'il n'existe pas;
+    un fichier existant garde ses colonnes (par exemple s'il date d'avant la colonne vignette)."""
+    existe = os.path.isfile(chemin)
+    if chemin.endswith(".parquet"):
+        if existe:
+            ancien = pq.read_table(chemin).to_pandas()
+            df = pd.concat([ancien, df.reindex(columns=ancien.columns)], ignore_index=True)
+        # un fichier parquet ne se complète pas: il est réécrit à côté puis remplacé d'un coup
+        temporaire = f"{chemin}.{threading.get_ident()}.part"
+        df.to_parquet(temporaire, index=False, engine="pyarrow")
+        os.replace(temporaire, chemin)
+        return
+    if existe:
+        df = df.reindex(columns=pd.read_csv(chemin, nrows=0).columns)
+    df.to_csv(chemin, mode="a", header=not existe, index=False)
+
+
+def ouvrir_sortie(chemin, colonnes):
+    """Choisit la sortie selon l'extension du fichier (.parquet ou csv par défaut)."""
+    if chemin.endswith(".parquet"):
+        return SortieParquet(chemin, colonnes)
+    return SortieCsv(chemin, colonnes)
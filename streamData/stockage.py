@@ -0,0 +1,184 @@
+import codecs
+import csv
+import hashlib
+import json
+import os
+import threading
+from functools import lru_cache
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from cache_http import DOSSIER_CACHE
+from normalisation import normaliser
+
+# copies colonnaires (parquet) des fichiers de la bibliothèque
+DOSSIER_COLONNAIRE = os.path.join(DOSSIER_CACHE, "colonnaire")
+
+# des groupes de lignes petits permettent de ne lire qu'une page de l'aperçu
+TAILLE_GROUPE = 50_000
+
+# le dialecte d'un csv est deviné sur son début
+TAILLE_ECHANTILLON = 64 * 1024
+SEPARATEURS = ",;\t|"
+
+
+def _encodage(echantillon):
+    if echantillon.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if echantillon.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    try:
+        echantillon.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError as e:
+        # caractère coupé en fin d'échantillon: le reste est bien de l'utf-8
+        if e.start >= len(echantillon) - 3:
+            return "utf-8"
+    # exports Excel « csv (séparateur: point-virgule) » des postes en français
+    try:
+        echantillon.decode("cp1252")
+        return "cp1252"
+    except UnicodeDecodeError:
+        return "latin-1"
+
+
+@lru_cache(maxsize=256)
+def _dialecte(chemin, taille, mtime):
+    with open(chemin, "rb") as f:
+        echantillon = f.read(TAILLE_ECHANTILLON)
+    encodage = _encodage(echantillon)
+    texte = echantillon.decode(encodage, errors="ignore")
+    if len(echantillon) == TAILLE_ECHANTILLON:
+        texte = texte[:texte.rfind("\n") + 1] or texte
+    try:
+        dialecte = csv.Sniffer().sniff(texte, delimiters=SEPARATEURS)
+        return {"sep": dialecte.delimiter, "quotechar": dialecte.quotechar or '"', "encoding": encodage}
+    except csv.Error:
+        # une seule colonne, ou rien de concluant
+        return {"sep": ",", "quotechar": '"', "encoding": encodage}
+
+
+def dialecte_csv(chemin):
+    """Options de lecture pandas d'un csv (séparateur, guillemets, encodage), devinées une fois par version du fichier."""
+    infos = os.stat(chemin)
+    return _dialecte(chemin, infos.st_size, infos.st_mtime)
+
+
+def cle_fichier(chemin):
+    """Clé de cache: chemin, date de modification et taille (un fichier modifié change de clé)."""
+    infos = os.stat(chemin)
+    return (os.path.abspath(chemin), infos.st_mtime_ns, infos.st_size)
+
+
+def lire_source(chemin):
+    """Lit un fichier csv ou xlsx de la bibliothèque tel quel."""
+    if chemin.endswith(".xlsx"):
+        return pd.read_excel(chemin)
+    return pd.read_csv(chemin, **dialecte_csv(chemin))
+
+
+def typer_colonnes(df):
+    """Rend catégorielles les colonnes texte qui ont peu de valeurs distinctes (bien plus compact)."""
+    df = df.copy()
+    for colonne in df.columns:
+        serie = df[colonne]
+        if isinstance(serie.dtype, pd.CategoricalDtype) or pd.api.types.is_numeric_dtype(serie):
+            continue
+        if serie.nunique() < 0.5 * len(serie):
+            df[colonne] = serie.astype("category")
+    return df
+
+
+# la taille et la date de modification de la source sont gardées dans les métadonnées de sa copie
+CLE_SOURCE = b"streamdata_source"
+
+
+def _nom_copie(chemin):
+    # deux fichiers de même nom dans des dossiers différents ont chacun leur copie
+    empreinte = hashlib.sha1(os.path.abspath(chemin).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(DOSSIER_COLONNAIRE, f"{os.path.basename(chemin)}.{empreinte}")
+
+
+def chemin_colonnaire(chemin):
+    return _nom_copie(chemin) + ".parquet"
+
+
+def chemin_quarantaine(chemin):
+    return _nom_copie(chemin) + ".quarantaine.csv"
+
+
+def _version(chemin):
+    infos = os.stat(chemin)
+    return json.dumps({"taille": infos.st_size, "mtime_ns": infos.st_mtime_ns}).encode("utf-8")
+
+
+def lire_quarantaine(chemin):
+    """Lignes écartées à la normalisation (avec leur motif), ou None s'il n'y en a pas."""
+    # la quarantaine est écrite avec la copie parquet, qui n'est faite qu'à la première lecture
+    if not a_jour(chemin):
+        try:
+            convertir(chemin)
+        except Exception:
+            return None
+    quarantaine = chemin_quarantaine(chemin)
+    return pd.read_csv(quarantaine) if os.path.exists(quarantaine) else None
+
+
+def a_jour(chemin):
+    """Vrai si la copie parquet existe et a été faite depuis la version actuelle du fichier source
+    (même taille et même date de modification, lues dans le pied du parquet)."""
+    copie = chemin_colonnaire(chemin)
+    if not os.path.exists(copie):
+        return False
+    try:
+        metadonnees = pq.read_schema(copie).metadata or {}
+    except Exception:
+        return False
+    return metadonnees.get(CLE_SOURCE) == _version(chemin)
+
+
+def convertir(chemin, source=None, partiel=None):
+    """Écrit la copie parquet typée d'un fichier de la bibliothèque (à l'upload ou en fin de scraping).
+
+    Les champs connus sont normalisés; les lignes illisibles vont dans un csv de quarantaine.
+    `source` évite de relire le fichier quand son contenu est déjà en mémoire; `partiel` est le
+    fichier temporaire pas encore renommé en `chemin` (le renommage garde sa taille et sa date).
+    """
+    # la version est relevée avant la lecture: une source modifiée entre-temps rendra la copie périmée
+    version = _version(partiel or chemin)
+    df, quarantaine = normaliser(lire_source(chemin) if source is None else source)
+    df = typer_colonnes(df)
+    os.makedirs(DOSSIER_COLONNAIRE, exist_ok=True)
+    if len(quarantaine):
+        quarantaine.to_csv(chemin_quarantaine(chemin), index=False)
+    elif os.path.exists(chemin_quarantaine(chemin)):
+        os.remove(chemin_quarantaine(chemin))
+    copie = chemin_colonnaire(chemin)
+    # un fichier temporaire par thread: l'upload et un affichage peuvent convertir en même temps
+    partielle = f"{copie}.{threading.get_ident()}.part"
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), CLE_SOURCE: version})
+    pq.write_table(table, partielle, row_group_size=TAILLE_GROUPE)
+    os.replace(partielle, copie)
+    return copie
+
+
+def lire_dataframe(chemin, colonnes=None):
+    """Lit un fichier de la bibliothèque depuis sa copie parquet (mappée en mémoire) si possible."""
+    if not a_jour(chemin):
+        try:
+            convertir(chemin)
+        except Exception:
+            # fichier que l'on ne sait pas typer: on se contente de la source
+            return lire_source(chemin)
+    return pq.read_table(chemin_colonnaire(chemin), columns=colonnes, memory_map=True).to_pandas()
+
+
+def supprimer(chemin):
+    """Supprime un fichier de la bibliothèque et sa copie colonnaire."""
+    os.remove(chemin)
+    for copie in (chemin_colonnaire(chemin), chemin_quarantaine(chemin)):
+        if os.path.exists(copie):
+            os.remove(copie)
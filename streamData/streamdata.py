@@ -0,0 +1,171 @@
+# StreamData sans navigateur: scraping, profilage et planifications depuis un terminal,
+# cron ou un conteneur; les fonctions scraper et profiler_fichier s'utilisent aussi depuis Python
+# usage: python streamdata.py scrape villas --pages 200 --out update_files/villas.csv
+#        python streamdata.py profile update_files/villas.csv [--json]
+#        python streamdata.py schedule [--config planification.json]
+import argparse
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+from historique import HistoriqueAnnonces
+from mesures import mesures_globales
+from moteur_crawl import BudgetCrawl
+from normalisation import normaliser
+from planificateur import DOSSIER_SORTIE, Planificateur, charger_planifications
+from profilage import profiler
+from stockage import convertir, lire_dataframe
+from utils import CATEGORIES, scraper_fichier
+from vignettes import TAILLE_MAX, MagasinVignettes
+
+
+def _ignorees():
+    compteurs = mesures_globales().instantane()["compteurs"]
+    return {point["etiquettes"].get("motif"): point["valeur"]
+            for point in compteurs.get("streamdata_annonces_ignorees_total", [])}
+
+
+def scraper(categorie, nbre_pages, sortie, incremental=False, historique=None, progression=None, vignettes=None, **options):
+    """Scrape une catégorie vers un fichier, écrit sa copie parquet et renvoie un résumé;
+    `vignettes` (un MagasinVignettes) ajoute le chemin local de la vignette de chaque annonce."""
+    if categorie not in CATEGORIES:
+        raise ValueError(f"catégorie inconnue: {categorie} (choix: {', '.join(CATEGORIES)})")
+    dossier = os.path.dirname(sortie)
+    if dossier:
+        os.makedirs(dossier, exist_ok=True)
+    if historique is not None and options.get("ttl") is None:
+        # les prix versés à l'historique doivent venir de pages revalidées, pas d'un cache de quelques heures
+        options["ttl"] = 0
+    debut, avant = time.time(), _ignorees()
+    lignes, nouvelles = scraper_fichier(categorie, nbre_pages, sortie, incremental, progression, vignettes, **options)
+    if lignes:
+        try:
+            convertir(sortie)
+        except Exception:
+            # la copie colonnaire sera refaite à la première lecture
+            pass
+        if historique is not None:
+            # en incrémental seules les nouvelles lignes sont des annonces vues à ce passage
+            vues = normaliser(nouvelles)[0] if incremental else lire_dataframe(sortie)
+            historique.integrer(vues, categorie, source=os.path.basename(sortie))
+    # les mesures sont cumulées par processus: seules celles de ce scraping sont rapportées
+    ignorees = {motif: nombre - avant.get(motif, 0) for motif, nombre in _ignorees().items() if nombre > avant.get(motif, 0)}
+    return {
+        "categorie": categorie,
+        "sortie": sortie,
+        "lignes": lignes,
+        "duree": round(time.time() - debut, 2),
+        "ignorees": ignorees,
+    }
+
+
+def profiler_fichier(chemin):
+    """Profil d'un fichier csv ou xlsx (types, manquants, distincts, valeurs fréquentes)."""
+    if not os.path.isfile(chemin):
+        raise FileNotFoundError(f"fichier introuvable: {chemin}")
+    return profiler(chemin)
+
+
+def commande_scrape(args):
+    budget = None
+    if args.max_requetes or args.max_mo or args.max_duree:
+        budget = BudgetCrawl(args.max_requetes, args.max_mo * 1024 * 1024 if args.max_mo else None, args.max_duree)
+    historique = None
+    if args.historique:
+        historique = HistoriqueAnnonces()
+
+    vignettes = MagasinVignettes(taille_max=int(args.vignettes_mo * 1024 * 1024)) if args.vignettes else None
+
+    def progression(lignes):
+        if not args.silencieux:
+            print(f"\r{lignes} annonces", end="", file=sys.stderr, flush=True)
+
+    try:
+        resume = scraper(args.categorie, args.pages, args.out, args.incremental, historique, progression, vignettes,
+                         concurrence=args.concurrence, requetes_par_seconde=args.requetes_par_seconde,
+                         processus=args.processus, budget=budget)
+    finally:
+        if not args.silencieux:
+            print(file=sys.stderr)
+        if args.mesures:
+            mesures_globales().exporter(args.mesures)
+        if historique is not None:
+            historique.close()
+        if vignettes is not None:
+            vignettes.close()
+    if args.json:
+        print(json.dumps(resume, ensure_ascii=False, indent=2))
+    else:
+        print(f"{resume['lignes']} annonces écrites dans {resume['sortie']} en {resume['duree']} s")
+        for motif, nombre in sorted(resume["ignorees"].items(), key=lambda element: -element[1]):
+            print(f"  ignorées ({motif}): {nombre}")
+
+
+def commande_profile(args):
+    profil = profiler_fichier(args.fichier)
+    if args.json:
+        print(json.dumps(profil, ensure_ascii=False, indent=2, default=str))
+        return
+    print(f"{args.fichier}: {profil['lignes']} lignes, {len(profil['colonnes'])} colonnes")
+    tableau = pd.DataFrame.from_dict(profil["colonnes"], orient="index").drop(columns="top")
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(tableau.to_string())
+
+
+def commande_schedule(args):
+    Planificateur(charger_planifications(args.config), args.max_concurrence, args.dossier).executer()
+
+
+def analyser_arguments(arguments=None):
+    parser = argparse.ArgumentParser(prog="streamdata", description="StreamData en ligne de commande")
+    commandes = parser.add_subparsers(dest="commande", required=True)
+
+    scrape = commandes.add_parser("scrape", help="scraper une catégorie vers un fichier csv ou parquet")
+    scrape.add_argument("categorie")
+    scrape.add_argument("--pages", type=int, default=1)
+    scrape.add_argument("--out", required=True, help="fichier de sortie (.csv ou .parquet)")
+    scrape.add_argument("--incremental", action="store_true", help="n'ajouter que les nouvelles annonces (csv ou parquet)")
+    scrape.add_argument("--concurrence", type=int, default=8)
+    scrape.add_argument("--requetes-par-seconde", type=float, default=4.0)
+    scrape.add_argument("--processus", type=int, default=0, help="processus d'analyse (0, par défaut: dans le thread du crawl)")
+    scrape.add_argument("--max-requetes", type=int, default=None)
+    scrape.add_argument("--max-mo", type=float, default=None, help="volume téléchargé maximum, en Mo")
+    scrape.add_argument("--max-duree", type=float, default=None, help="durée maximum, en secondes")
+    scrape.add_argument("--historique", action="store_true", help="intégrer les annonces à l'historique des prix")
+    scrape.add_argument("--vignettes", action="store_true", help="télécharger les images en vignettes (colonne « vignette »)")
+    scrape.add_argument("--vignettes-mo", type=float, default=TAILLE_MAX / (1024 * 1024), help="taille maximum du magasin de vignettes, en Mo")
+    scrape.add_argument("--mesures", default=None, help="dossier où écrire mesures.json et mesures.prom")
+    scrape.add_argument("--json", action="store_true", help="résumé au format JSON")
+    scrape.add_argument("--silencieux", action="store_true", help="pas de progression sur stderr")
+    scrape.set_defaults(executer=commande_scrape)
+
+    profile = commandes.add_parser("profile", help="profiler un fichier csv ou xlsx par morceaux")
+    profile.add_argument("fichier")
+    profile.add_argument("--json", action="store_true")
+    profile.set_defaults(executer=commande_profile)
+
+    schedule = commandes.add_parser("schedule", help="lancer le planificateur des scrapings récurrents")
+    schedule.add_argument("--config", default="planification.json")
+    schedule.add_argument("--max-concurrence", type=int, default=2)
+    schedule.add_argument("--dossier", default=DOSSIER_SORTIE)
+    schedule.set_defaults(executer=commande_schedule)
+    return parser.parse_args(arguments)
+
+
+def main(arguments=None):
+    args = analyser_arguments(arguments)
+    try:
+        args.executer(args)
+    except KeyboardInterrupt:
+        return 130
+    except Exception as e:
+        print(f"erreur: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cache_http import DOSSIER_CACHE
+from mesures import mesures_globales
+
+EN_ATTENTE = "en attente"
+EN_COURS = "en cours"
+TERMINEE = "terminée"
+ECHOUEE = "échouée"
+INTERROMPUE = "interrompue"
+
+COLONNES = ["id", "categorie", "nbre_pages", "chemin", "incremental", "statut",
+            "lignes", "erreur", "soumise_le", "debut", "fin", "pid"]
+
+
+def processus_vivant(pid):
+    """Vrai si un processus de ce pid tourne encore."""
+    if os.name == "nt":
+        import ctypes
+        # PROCESS_QUERY_LIMITED_INFORMATION
+        poignee = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)
+        if not poignee:
+            return False
+        ctypes.windll.kernel32.CloseHandle(poignee)
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# exécute les scrapings en arrière-plan: la table des tâches est persistée sur disque,
+# l'interface soumet une tâche puis consulte son statut quand elle veut; la table est
+# partagée avec le planificateur, chaque tâche garde le pid du processus qui l'exécute
+class GestionnaireTaches:
+    def __init__(self, chemin=os.path.join(DOSSIER_CACHE, "taches.sqlite"), workers=2, catalogue=None, historique=None,
+                 magasin_vignettes=None):
+        self.catalogue = catalogue
+        self.historique = historique
+        self.magasin_vignettes = magasin_vignettes
+        self.verrou = threading.Lock()
+        dossier = os.path.dirname(chemin)
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+        self.conn = sqlite3.connect(chemin, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS taches (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                categorie TEXT NOT NULL,
+                nbre_pages INTEGER NOT NULL,
+                chemin TEXT NOT NULL,
+                incremental INTEGER NOT NULL DEFAULT 0,
+                statut TEXT NOT NULL,
+                lignes INTEGER NOT NULL DEFAULT 0,
+                erreur TEXT,
+                soumise_le REAL NOT NULL,
+                debut REAL,
+                fin REAL,
+                pid INTEGER
+            )
+        """)
+        if "pid" not in [colonne[1] for colonne in self.conn.execute("PRAGMA table_info(taches)")]:
+            self.conn.execute("ALTER TABLE taches ADD COLUMN pid INTEGER")
+        self._recuperer()
+        self.conn.commit()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scraping")
+
+    def _recuperer(self):
+        """Marque interrompues les tâches d'un processus arrêté: elles ne reprendront pas toutes
+        seules. Celles d'un processus encore vivant (l'appli ou le planificateur) sont laissées."""
+        pids = [pid for pid, in self.conn.execute(
+            "SELECT DISTINCT pid FROM taches WHERE statut IN (?, ?)", (EN_ATTENTE, EN_COURS))]
+        # un pid égal au nôtre vient d'un processus précédent qui a eu le même numéro
+        arretes = [pid for pid in pids if pid is None or pid == os.getpid() or not processus_vivant(pid)]
+        for pid in arretes:
+            self.conn.execute("UPDATE taches SET statut = ? WHERE statut IN (?, ?) AND pid IS ?",
+                              (INTERROMPUE, EN_ATTENTE, EN_COURS, pid))
+
+    def _maj(self, id_tache, **valeurs):
+        colonnes = ", ".join(f"{nom} = ?" for nom in valeurs)
+        with self.verrou:
+            self.conn.execute(f"UPDATE taches SET {colonnes} WHERE id = ?", [*valeurs.values(), id_tache])
+            self.conn.commit()
+
+    def soumettre(self, categorie, nbre_pages, chemin, incremental=False, vignettes=False, ttl=None):
+        """Enregistre une tâche de scraping et la place dans la file des workers
+        (avec vignettes=True, les images des annonces sont aussi téléchargées, ttl borne l'âge des pages en cache).
+        Lève ValueError si une tâche active écrit déjà dans ce fichier."""
+        chemin = os.path.abspath(chemin)
+        with self.verrou:
+            # deux tâches sur le même fichier mélangeraient leurs écritures dans le fichier temporaire
+            # (celles d'un processus arrêté entre-temps ne comptent pas)
+            for id_occupee, pid in self.conn.execute(
+                    "SELECT id, pid FROM taches WHERE chemin = ? AND statut IN (?, ?)", (chemin, EN_ATTENTE, EN_COURS)):
+                if pid is not None and processus_vivant(pid):
+                    raise ValueError(f"le scraping n°{id_occupee} écrit déjà dans {os.path.basename(chemin)}")
+            curseur = self.conn.execute(
+                "INSERT INTO taches (categorie, nbre_pages, chemin, incremental, statut, soumise_le, pid) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (categorie, nbre_pages, chemin, int(incremental), EN_ATTENTE, time.time(), os.getpid()),
+            )
+            self.conn.commit()
+            id_tache = curseur.lastrowid
+        magasin = self.magasin_vignettes if vignettes else None
+        self.executor.submit(self._executer, id_tache, categorie, nbre_pages, chemin, incremental, magasin, ttl)
+        return id_tache
+
+    def _executer(self, id_tache, categorie, nbre_pages, chemin, incremental, vignettes=None, ttl=None):
+        # import local: streamdata importe le planificateur, qui importe ce module
+        from streamdata import scraper
+
+        self._maj(id_tache, statut=EN_COURS, debut=time.time())
+        try:
+            # même enchaînement qu'en ligne de commande: scraping, copie parquet, historique
+            lignes = scraper(categorie, nbre_pages, chemin, incremental, self.historique,
+                             progression=lambda n: self._maj(id_tache, lignes=n), vignettes=vignettes, ttl=ttl)["lignes"]
+            if lignes and self.catalogue is not None:
+                self.catalogue.enregistrer(os.path.basename(chemin))
+        except Exception as e:
+            self._maj(id_tache, statut=ECHOUEE, erreur=str(e), fin=time.time())
+        else:
+            self._maj(id_tache, statut=TERMINEE, lignes=lignes, fin=time.time())
+        finally:
+            # les mesures cumulées sont aussi écrites sur disque (json et format Prometheus)
+            try:
+                mesures_globales().exporter()
+            except OSError:
+                pass
+
+    def tache(self, id_tache):
+        with self.verrou:
+            ligne = self.conn.execute("SELECT * FROM taches WHERE id = ?", (id_tache,)).fetchone()
+        return dict(zip(COLONNES, ligne)) if ligne else None
+
+    def taches(self, limite=20):
+        """Renvoie les tâches les plus récentes, de la plus récente à la plus ancienne."""
+        with self.verrou:
+            lignes = self.conn.execute("SELECT * FROM taches ORDER BY id DESC LIMIT ?", (limite,)).fetchall()
+        return [dict(zip(COLONNES, ligne)) for ligne in lignes]
+
+    def actives(self):
+        return [t for t in self.taches(limite=100) if t["statut"] in (EN_ATTENTE, EN_COURS)]
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        with self.verrou:
+            self.conn.close()
@@ -0,0 +1,130 @@
+import hashlib
+import hmac
+import os
+import secrets
+import socket
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlparse, urlsplit
+
+# serveur des téléchargements, à côté de Streamlit; modifiable avec les variables d'environnement
+# STREAMDATA_TELECHARGEMENTS_HOTE (interface écoutée, toutes par défaut comme Streamlit) / _PORT,
+# et _URL, l'adresse vue par les navigateurs quand il est exposé derrière un proxy
+HOTE_PAR_DEFAUT = os.environ.get("STREAMDATA_TELECHARGEMENTS_HOTE", "0.0.0.0")
+PORT_PAR_DEFAUT = int(os.environ.get("STREAMDATA_TELECHARGEMENTS_PORT", "8502"))
+URL_PUBLIQUE = os.environ.get("STREAMDATA_TELECHARGEMENTS_URL")
+
+BOUCLES_LOCALES = ("127.0.0.1", "::1", "localhost")
+
+TAILLE_BLOC = 1024 * 1024
+PREFIXE = "/fichiers/"
+
+
+class GestionnaireFichiers(BaseHTTPRequestHandler):
+    """Sert les fichiers de la bibliothèque: sendfile tel quel, ou csv compressé à la volée."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def _fichier(self):
+        url = urlparse(self.path)
+        if not url.path.startswith(PREFIXE):
+            return None
+        nom = unquote(url.path[len(PREFIXE):])
+        jeton = parse_qs(url.query).get("jeton", [""])[0]
+        # seuls les liens produits par l'application sont servis, jamais en dehors du dossier
+        if nom != os.path.basename(nom) or nom.startswith(".") or nom.endswith(".part"):
+            return None
+        if not hmac.compare_digest(jeton, self.server.jeton(nom)):
+            return None
+        chemin = os.path.join(self.server.dossier, nom)
+        return chemin if os.path.isfile(chemin) else None
+
+    def do_GET(self):
+        chemin = self._fichier()
+        if chemin is None:
+            self.send_error(404)
+            return
+        nom = os.path.basename(chemin)
+        compresser = nom.endswith(".csv") and "gzip" in self.headers.get("Accept-Encoding", "")
+        with open(chemin, "rb") as f:
+            taille = os.fstat(f.fileno()).st_size
+            self.send_response(200)
+            self.send_header("Content-Type", "text/csv; charset=utf-8" if nom.endswith(".csv") else "application/octet-stream")
+            self.send_header("Content-Disposition", f"attachment; filename*=UTF-8''{quote(nom)}")
+            if compresser:
+                # taille inconnue d'avance: la fin de la réponse est marquée par la fermeture
+                self.send_header("Content-Encoding", "gzip")
+                self.send_header("Connection", "close")
+                self.close_connection = True
+                self.end_headers()
+                compresseur = zlib.compressobj(6, zlib.DEFLATED, 31)
+                for bloc in iter(lambda: f.read(TAILLE_BLOC), b""):
+                    self.wfile.write(compresseur.compress(bloc))
+                self.wfile.write(compresseur.flush())
+            else:
+                self.send_header("Content-Length", str(taille))
+                self.end_headers()
+                # noyau -> socket sans passer par Python (os.sendfile, avec repli en lecture par blocs)
+                self.connection.sendfile(f)
+
+
+# petit serveur http en thread: la page ne produit que des liens, un fichier n'est lu
+# que lorsqu'il est effectivement téléchargé
+class ServeurFichiers(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, dossier, hote=HOTE_PAR_DEFAUT, port=PORT_PAR_DEFAUT, url_publique=URL_PUBLIQUE):
+        super().__init__((hote, port), GestionnaireFichiers)
+        self.dossier = dossier
+        self.secret = secrets.token_bytes(32)
+        self.url_publique = url_publique.rstrip("/") if url_publique else None
+        self.thread = None
+
+    def jeton(self, nom):
+        return hmac.new(self.secret, nom.encode("utf-8"), hashlib.sha256).hexdigest()[:32]
+
+    def url_base(self, hote_requete):
+        """Adresse du serveur vue par le navigateur, d'après l'en-tête Host de la page Streamlit.
+
+        None si le navigateur ne peut pas le joindre directement: appli servie derrière un
+        proxy (pas de port dans Host) sans URL publique configurée, ou serveur n'écoutant
+        que la boucle locale alors que la page vient d'une autre machine.
+        """
+        if self.url_publique:
+            return self.url_publique
+        if not hote_requete:
+            return None
+        try:
+            adresse = urlsplit(f"//{hote_requete}")
+            nom_hote, port = adresse.hostname, adresse.port
+        except ValueError:
+            return None
+        if not nom_hote or port is None:
+            return None
+        if self.server_address[0] in BOUCLES_LOCALES and nom_hote not in BOUCLES_LOCALES:
+            return None
+        if ":" in nom_hote:
+            # adresse IPv6: joignable seulement si le serveur écoute en IPv6
+            if self.address_family != socket.AF_INET6:
+                return None
+            nom_hote = f"[{nom_hote}]"
+        return f"http://{nom_hote}:{self.server_address[1]}"
+
+    def lien(self, nom, hote_requete=None):
+        """URL de téléchargement d'un fichier de la bibliothèque, ou None si le serveur
+        n'est pas joignable depuis le navigateur (voir url_base)."""
+        base = self.url_base(hote_requete)
+        if base is None:
+            return None
+        return f"{base}{PREFIXE}{quote(nom)}?jeton={self.jeton(nom)}"
+
+    def demarrer(self):
+        self.thread = threading.Thread(target=self.serve_forever, name="telechargements", daemon=True)
+        self.thread.start()
+        return self
+
+    def arreter(self):
+        self.shutdown()
+        self.server_close()
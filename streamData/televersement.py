@@ -0,0 +1,160 @@
+import os
+import re
+import shutil
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from stockage import TAILLE_ECHANTILLON, convertir, dialecte_csv, lire_dataframe
+
+# l'upload est recopié sur disque par blocs, jamais en un seul tampon
+TAILLE_BLOC = 1024 * 1024
+
+EN_COURS = "en cours"
+TERMINEE = "terminée"
+ECHOUEE = "échouée"
+
+
+class FichierInvalide(ValueError):
+    pass
+
+
+def ecrire_par_blocs(source, chemin, taille_bloc=TAILLE_BLOC):
+    """Recopie un fichier ouvert (upload Streamlit, fichier local) sur disque par blocs; renvoie la taille."""
+    if hasattr(source, "seek"):
+        source.seek(0)
+    with open(chemin, "wb") as f:
+        shutil.copyfileobj(source, f, taille_bloc)
+        return f.tell()
+
+
+def valider(chemin, extension):
+    """Vérifie qu'un fichier reçu est lisible avant de l'ajouter à la bibliothèque."""
+    if os.path.getsize(chemin) == 0:
+        raise FichierInvalide("le fichier est vide")
+    if extension == ".xlsx":
+        if not zipfile.is_zipfile(chemin):
+            raise FichierInvalide("ce n'est pas un classeur xlsx")
+        return None
+    dialecte = dialecte_csv(chemin)
+    with open(chemin, "rb") as f:
+        echantillon = f.read(TAILLE_ECHANTILLON)
+    if b"\x00" in echantillon and dialecte["encoding"] != "utf-16":
+        raise FichierInvalide("le fichier n'est pas un csv texte")
+    try:
+        pd.read_csv(chemin, nrows=100, **dialecte)
+    except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError) as e:
+        raise FichierInvalide(f"csv illisible: {e}")
+    return dialecte
+
+
+def nom_feuille(nom_classeur, feuille):
+    """Nom du csv qui reçoit une feuille supplémentaire d'un classeur."""
+    base = os.path.splitext(nom_classeur)[0]
+    feuille = re.sub(r"[^\w .-]", "_", str(feuille)).strip()
+    return f"{base} - {feuille}.csv"
+
+
+# réception des fichiers de la page Upload: l'écriture par blocs et la validation sont faites
+# tout de suite, la conversion (parquet, catalogue, historique) par un worker en arrière-plan;
+# un classeur n'apparaît dans la bibliothèque qu'une fois sa copie parquet écrite, pour que
+# le premier affichage ne repasse pas par openpyxl
+class Televersements:
+    def __init__(self, dossier, catalogue=None, historique=None, workers=1):
+        self.dossier = dossier
+        self.catalogue = catalogue
+        self.historique = historique
+        self.verrou = threading.Lock()
+        self.etats = {}
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="conversion")
+
+    def _maj(self, nom, statut, erreur=None):
+        with self.verrou:
+            self.etats[nom] = {"nom": nom, "statut": statut, "erreur": erreur, "le": time.time()}
+
+    def recevoir(self, source, nom):
+        """Écrit un fichier reçu dans la bibliothèque et planifie sa conversion.
+
+        Lève FichierInvalide si le fichier ne peut pas être lu; rien n'est alors ajouté.
+        """
+        nom = os.path.basename(nom)
+        extension = os.path.splitext(nom)[1].lower()
+        if extension not in (".csv", ".xlsx"):
+            raise FichierInvalide("seuls les fichiers csv et xlsx sont acceptés")
+        chemin = os.path.join(self.dossier, nom)
+        partiel = chemin + ".part"
+        try:
+            ecrire_par_blocs(source, partiel)
+            valider(partiel, extension)
+        except Exception:
+            if os.path.exists(partiel):
+                os.remove(partiel)
+            raise
+        if extension == ".csv":
+            # un csv est lisible tel quel: il rejoint la bibliothèque sans attendre la conversion
+            os.replace(partiel, chemin)
+        self._maj(nom, EN_COURS)
+        self.executor.submit(self._convertir, nom, extension)
+        return nom
+
+    def _publier(self, nom, df=None, partiel=None):
+        """Convertit puis rend visible un fichier; la copie parquet est écrite avant que la
+        source n'apparaisse dans la bibliothèque, elle est donc à jour dès le premier affichage."""
+        chemin = os.path.join(self.dossier, nom)
+        try:
+            convertir(chemin, source=df, partiel=partiel)
+        except Exception:
+            # fichier que l'on ne sait pas typer: il sera relu depuis sa source
+            pass
+        if partiel is not None:
+            os.replace(partiel, chemin)
+        if self.catalogue is not None:
+            self.catalogue.enregistrer(nom)
+        if self.historique is not None:
+            # les annonces du fichier rejoignent la table consolidée et l'historique des prix
+            try:
+                self.historique.integrer(lire_dataframe(chemin), "import", source=nom)
+            except Exception:
+                pass
+
+    def _convertir(self, nom, extension):
+        try:
+            if extension == ".csv":
+                self._publier(nom)
+            else:
+                partiel = os.path.join(self.dossier, nom) + ".part"
+                try:
+                    # le classeur est lu une seule fois, toutes feuilles comprises
+                    feuilles = pd.read_excel(partiel, sheet_name=None)
+                except Exception:
+                    os.remove(partiel)
+                    raise
+                premiere, *autres = feuilles.items()
+                self._publier(nom, premiere[1], partiel)
+                for feuille, df in autres:
+                    if df.empty:
+                        continue
+                    nom_csv = nom_feuille(nom, feuille)
+                    partiel_csv = os.path.join(self.dossier, nom_csv) + ".part"
+                    df.to_csv(partiel_csv, index=False)
+                    self._publier(nom_csv, df, partiel_csv)
+        except Exception as e:
+            self._maj(nom, ECHOUEE, str(e))
+        else:
+            self._maj(nom, TERMINEE)
+
+    def en_cours(self):
+        with self.verrou:
+            return [etat for etat in self.etats.values() if etat["statut"] == EN_COURS]
+
+    def recents(self, limite=10):
+        """Derniers fichiers reçus, du plus récent au plus ancien."""
+        with self.verrou:
+            etats = sorted(self.etats.values(), key=lambda etat: etat["le"], reverse=True)
+        return etats[:limite]
+
+    def close(self):
+        self.executor.shutdown(wait=True)
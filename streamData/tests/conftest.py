@@ -0,0 +1,8 @@
+# les modules de l'appli (et le serveur de rejeu des benchmarks) s'importent par leur nom,
+# comme lorsque l'appli est lancée depuis streamData/
+import os
+import sys
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+sys.path.insert(0, os.path.join(RACINE, "benchmarks"))
@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+
+from historique import HistoriqueAnnonces
+
+
+@pytest.fixture
+def historique(tmp_path):
+    historique = HistoriqueAnnonces(str(tmp_path / "historique.sqlite"))
+    yield historique
+    historique.close()
+
+
+def instantane(prix):
+    return pd.DataFrame({"id annonce": list(prix), "prix": list(prix.values()), "adresse": ["Dakar"] * len(prix)})
+
+
+def test_changement_de_prix(historique):
+    assert historique.integrer(instantane({1: 1000, 2: 2000}), "villas", vu_le=1) == {
+        "nouvelles": 2, "modifiees": 0, "inchangees": 0}
+    assert historique.integrer(instantane({1: 1500, 2: 2000, 3: 3000}), "villas", vu_le=2) == {
+        "nouvelles": 1, "modifiees": 1, "inchangees": 1}
+
+    variations = historique.variations()
+    assert variations[["cle", "ancien_prix", "nouveau_prix"]].values.tolist() == [["id:1", 1000, 1500]]
+    assert variations["variation %"].iloc[0] == pytest.approx(50)
+    assert historique.historique_prix("id:1")["prix"].tolist() == [1000, 1500]
+    assert historique.resume() == {"annonces": 3, "changements": 1}
+
+
+def test_prix_inchange_sans_point(historique):
+    for vu_le in (1, 2, 3):
+        historique.integrer(instantane({1: 1000}), "villas", vu_le=vu_le)
+    # l'historique grandit avec les changements, pas avec les instantanés
+    assert historique.historique_prix("id:1")["prix"].tolist() == [1000]
+    assert historique.variations().empty
+    consolidees = historique.consolidees("villas")
+    assert consolidees["vues"].tolist() == [3]
+
+
+def test_annonces_sans_identifiant(historique):
+    # sans identifiant, la clé est un hash du contenu hors prix: le prix peut donc changer
+    df = pd.DataFrame({"prix": [1000], "adresse": ["Fann, Dakar"], "superficie": ["300 m2"]})
+    historique.integrer(df, "terrains", vu_le=1)
+    resultat = historique.integrer(df.assign(prix=900), "terrains", vu_le=2)
+    assert resultat == {"nouvelles": 0, "modifiees": 1, "inchangees": 0}
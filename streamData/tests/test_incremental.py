@@ -0,0 +1,51 @@
+# le scraping incrémental ne marque une annonce vue qu'une fois écrite sur disque
+import pandas as pd
+import pytest
+
+import utils
+from client_http import ClientHttp
+from index_annonces import IndexAnnonces
+from serveur_rejeu import ServeurRejeu
+
+DEBIT = 1000.0
+
+
+@pytest.fixture
+def serveur(monkeypatch):
+    serveur = ServeurRejeu(latence=0).demarrer()
+    monkeypatch.setattr(utils, "BASE_URL", serveur.url)
+    yield serveur
+    serveur.arreter()
+
+
+def scraper(nbre_pages, chemin, index):
+    client = ClientHttp(cache=None)
+    try:
+        return utils.scrap_incremental("villas", nbre_pages, chemin, requetes_par_seconde=DEBIT, client=client, index=index)
+    finally:
+        client.close()
+
+
+def test_page_de_liste_vide_ignoree(serveur, tmp_path, monkeypatch):
+    page = serveur.page
+    monkeypatch.setattr(serveur, "page", lambda chemin: b"" if chemin.endswith("page=2") else page(chemin))
+    index = IndexAnnonces(str(tmp_path / "index.sqlite"))
+    chemin = str(tmp_path / "villas.csv")
+
+    nouvelles = scraper(3, chemin, index)
+    assert len(nouvelles) == 80
+    ecrites = pd.read_csv(chemin)
+    assert len(ecrites) == 80
+    assert index.connus("villas", ecrites["id annonce"].tolist()) == set(ecrites["id annonce"])
+
+
+def test_echec_ecriture_ne_marque_rien(serveur, tmp_path):
+    index = IndexAnnonces(str(tmp_path / "index.sqlite"))
+    # un dossier à la place du fichier de sortie fait échouer l'écriture
+    bloque = tmp_path / "villas.csv"
+    bloque.mkdir()
+    with pytest.raises(OSError):
+        scraper(2, str(bloque), index)
+
+    bloque.rmdir()
+    assert len(scraper(2, str(bloque), index)) == 80
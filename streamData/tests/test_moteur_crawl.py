@@ -0,0 +1,66 @@
+# une page revalidée (304) est comptée à part et ne compte pas comme octets téléchargés
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from cache_http import CacheHttp
+from client_http import ClientHttp
+from mesures import Mesures
+from moteur_crawl import BudgetCrawl, Crawler
+
+PAGE = b"<html><body>annonce</body></html>"
+
+
+class GestionnaireEtag(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(len(PAGE)))
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+
+@pytest.fixture
+def url():
+    serveur = ThreadingHTTPServer(("127.0.0.1", 0), GestionnaireEtag)
+    threading.Thread(target=serveur.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{serveur.server_address[1]}/annonce-1"
+    serveur.shutdown()
+    serveur.server_close()
+
+
+def compteur(mesures, nom, **etiquettes):
+    points = mesures.instantane()["compteurs"].get(nom, [])
+    return sum(point["valeur"] for point in points if etiquettes.items() <= point["etiquettes"].items())
+
+
+def test_revalidation_comptee_a_part(url, tmp_path):
+    mesures, budget = Mesures(), BudgetCrawl()
+    client = ClientHttp(cache=CacheHttp(str(tmp_path / "http.sqlite")))
+
+    async def crawler():
+        async with Crawler(requetes_par_seconde=1000, client=client, budget=budget, mesures=mesures) as c:
+            assert await c.fetch(url) == PAGE.decode()
+            assert await c.fetch(url) == PAGE.decode()
+            # ttl=0: la copie en cache est revalidée, le serveur répond 304
+            assert await c.fetch(url, ttl=0) == PAGE.decode()
+
+    try:
+        asyncio.run(crawler())
+    finally:
+        client.close()
+    assert compteur(mesures, "streamdata_requetes_total", statut="ok") == 1
+    assert compteur(mesures, "streamdata_requetes_total", statut="cache") == 1
+    assert compteur(mesures, "streamdata_requetes_total", statut="revalide") == 1
+    assert compteur(mesures, "streamdata_octets_telecharges_total") == len(PAGE)
+    assert budget.octets == len(PAGE)
+    assert mesures.taux_cache() == pytest.approx(2 / 3)
@@ -0,0 +1,40 @@
+import pandas as pd
+
+from normalisation import normaliser
+
+
+def annonces():
+    return pd.DataFrame({
+        "prix": ["25 000 000 CFA", "Prix sur demande", "abc", "45.000.000", "-5"],
+        "superficie": ["800 m2", "1,5 ha", "300", "?", "200 m2"],
+        "nombre pieces": ["4", "3", "2", "1", "5"],
+        "adresse": ["Fann, Dakar, Sénégal", "Mbour, Sénégal", "Sénégal", "Ngor, Dakar, Sénégal", "Thiès, Sénégal"],
+    })
+
+
+def test_champs_types():
+    propres, _ = normaliser(annonces())
+    assert propres["prix"].tolist()[0] == 25_000_000
+    # « sur demande » est un prix manquant, pas une valeur illisible
+    assert pd.isna(propres["prix"].iloc[1])
+    assert propres["superficie"].tolist() == [800, 15_000]
+    assert pd.api.types.is_integer_dtype(propres["nombre pieces"])
+    assert propres["ville"].tolist() == ["Fann", "Mbour"]
+    assert propres["region"].tolist() == ["Dakar", "Mbour"]
+
+
+def test_quarantaine():
+    propres, quarantaine = normaliser(annonces())
+    # chaque ligne est gardée ou mise en quarantaine, jamais perdue
+    assert len(propres) + len(quarantaine) == len(annonces())
+    assert quarantaine["motif"].tolist() == ["prix illisible", "surface illisible", "prix hors bornes"]
+    # les lignes en quarantaine gardent leurs valeurs d'origine
+    assert quarantaine["prix"].tolist() == ["abc", "45.000.000", "-5"]
+
+
+def test_surface_decalee_realignee():
+    df = pd.DataFrame({"superficie": [None], "nombre pieces": ["450 m2"], "prix": ["1000"]})
+    propres, quarantaine = normaliser(df)
+    assert quarantaine.empty
+    assert propres["superficie"].tolist() == [450]
+    assert pd.isna(propres["nombre pieces"].iloc[0])
@@ -0,0 +1,46 @@
+from datetime import datetime
+
+import pytest
+
+from planificateur import ExpressionCron, lire_champ
+
+
+def test_lire_champ():
+    assert lire_champ("*", 0, 6) == set(range(7))
+    assert lire_champ("*/15", 0, 59) == {0, 15, 30, 45}
+    assert lire_champ("8-18/5", 0, 23) == {8, 13, 18}
+    assert lire_champ("1,3,5-6", 0, 6) == {1, 3, 5, 6}
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "* 5-2 * * *", "*/0 * * * *", "* * 0 * *"])
+def test_expression_invalide(expression):
+    with pytest.raises(ValueError):
+        ExpressionCron(expression)
+
+
+def test_correspond():
+    cron = ExpressionCron("*/15 8-18 * * 1-5")
+    # le 19 octobre 2026 est un lundi
+    assert cron.correspond(datetime(2026, 10, 19, 8, 45))
+    assert not cron.correspond(datetime(2026, 10, 19, 8, 40))
+    assert not cron.correspond(datetime(2026, 10, 19, 19, 0))
+    assert not cron.correspond(datetime(2026, 10, 18, 9, 0))
+
+
+def test_dimanche_vaut_zero():
+    cron = ExpressionCron("0 6 * * 0")
+    assert cron.correspond(datetime(2026, 10, 18, 6, 0))
+    assert not cron.correspond(datetime(2026, 10, 19, 6, 0))
+
+
+def test_jours_restreints_en_ou():
+    # comme cron: le 1er du mois ou chaque lundi
+    cron = ExpressionCron("0 6 1 * 1")
+    assert cron.correspond(datetime(2026, 10, 1, 6, 0))
+    assert cron.correspond(datetime(2026, 10, 19, 6, 0))
+    assert not cron.correspond(datetime(2026, 10, 20, 6, 0))
+
+
+def test_un_seul_champ_jour_restreint():
+    assert not ExpressionCron("0 6 1 * *").correspond(datetime(2026, 10, 19, 6, 0))
+    assert not ExpressionCron("0 6 * * 1").correspond(datetime(2026, 10, 1, 6, 0))
@@ -0,0 +1,28 @@
+import pandas as pd
+
+import stockage
+from profilage import profiler
+
+
+def test_profil_normalise_sans_copie(tmp_path, monkeypatch):
+    monkeypatch.setattr(stockage, "DOSSIER_COLONNAIRE", str(tmp_path / "colonnaire"))
+    chemin = str(tmp_path / "annonces.csv")
+    pd.DataFrame({
+        "prix": ["25 000 000 CFA", "abc", "30 000 000 CFA", "-5"],
+        "adresse": ["Fann, Dakar, Sénégal", "Mbour, Sénégal", "Ngor, Dakar, Sénégal", "Thiès, Sénégal"],
+    }).to_csv(chemin, index=False)
+
+    # la source est normalisée par morceaux, sans écrire la copie parquet
+    profil = profiler(chemin, taille=3, normalise=True)
+    assert not stockage.a_jour(chemin)
+    assert profil["lignes"] == 2
+    assert profil["quarantaine"] == 2
+    assert profil["colonnes"]["prix"]["type"] == "entier"
+    assert profil["colonnes"]["prix"]["max"] == 30_000_000
+
+    # une fois le fichier converti, le profil de la copie est le même
+    stockage.convertir(chemin)
+    profil_copie = profiler(chemin, normalise=True)
+    assert profil_copie["lignes"] == profil["lignes"]
+    assert profil_copie["quarantaine"] == profil["quarantaine"]
+    assert profil_copie["colonnes"]["prix"] == profil["colonnes"]["prix"]
@@ -0,0 +1,52 @@
+# un scraping enregistré dans le cache http se rejoue hors ligne, sans aucune requête
+import pandas as pd
+import pytest
+
+import utils
+from cache_http import CacheHttp
+from client_http import ClientHttp
+from serveur_rejeu import ServeurRejeu
+
+# le limiteur de débit protège le vrai site, pas le serveur de rejeu
+DEBIT = 1000.0
+
+
+@pytest.fixture
+def serveur(monkeypatch):
+    serveur = ServeurRejeu(latence=0).demarrer()
+    monkeypatch.setattr(utils, "BASE_URL", serveur.url)
+    yield serveur
+    serveur.arreter()
+
+
+def scraper(categorie, nbre_pages, cache):
+    client = ClientHttp(cache=cache)
+    try:
+        fonction = utils.scrap_villas if categorie == "villas" else utils.scrap_terrains
+        return fonction(nbre_pages, requetes_par_seconde=DEBIT, client=client)
+    finally:
+        client.close()
+
+
+@pytest.mark.parametrize("categorie", ["villas", "terrains"])
+def test_rejeu_hors_ligne_sans_requete(serveur, tmp_path, categorie):
+    chemin = str(tmp_path / "http.sqlite")
+    enregistre = scraper(categorie, 2, CacheHttp(chemin))
+    # 2 pages de liste de 40 annonces, chacune avec sa page de détail
+    assert len(enregistre) == 80
+    assert serveur.requetes == 82
+
+    rejoue = scraper(categorie, 2, CacheHttp(chemin, hors_ligne=True))
+    assert serveur.requetes == 82
+    pd.testing.assert_frame_equal(rejoue, enregistre)
+
+
+def test_page_absente_du_cache_hors_ligne(serveur, tmp_path):
+    chemin = str(tmp_path / "http.sqlite")
+    scraper("villas", 1, CacheHttp(chemin))
+    requetes = serveur.requetes
+
+    # la page 2 n'a jamais été enregistrée: elle est ignorée au lieu d'être téléchargée
+    rejoue = scraper("villas", 2, CacheHttp(chemin, hors_ligne=True))
+    assert serveur.requetes == requetes
+    assert len(rejoue) == 40
@@ -1,101 +1,287 @@
-from bs4 import BeautifulSoup as bs
 import pandas as pd
 import numpy as np 
-from requests import get
+import asyncio
+import queue
+import threading
+from urllib.parse import urljoin
+from moteur_crawl import Crawler, EtageAnalyse
+from index_annonces import IndexAnnonces, extraire_id
+from sorties import ajouter, ouvrir_sortie
+from extraction import (Annonces, AnnonceIgnoree, Extracteur, CONTENEUR_LISTE, CONTENEUR_VILLA, CHAMPS_LISTE_VILLAS,
+                        CHAMPS_LISTE_TERRAINS, CHAMPS_VILLA, CHAMPS_TERRAIN)
 
-# fonction pour scraper les villas
-def scrap_villas(nbre_pages):
-    data = {
-        "type annonce": [],
-        "nombre pieces": [],
-        "prix": [],
-        "adresse": [],
-        "image lien": []
+BASE_URL = 'https://sn.coinafrique.com'
+
+# extracteurs précompilés (backend lxml par défaut, BeautifulSoup en secours)
+EXTRACTEUR_LISTE_VILLAS = Extracteur(CHAMPS_LISTE_VILLAS, conteneur=CONTENEUR_LISTE)
+EXTRACTEUR_VILLA = Extracteur(CHAMPS_VILLA, conteneur=CONTENEUR_VILLA)
+EXTRACTEUR_LISTE_TERRAINS = Extracteur(CHAMPS_LISTE_TERRAINS, conteneur=CONTENEUR_LISTE)
+EXTRACTEUR_TERRAIN = Extracteur(CHAMPS_TERRAIN, conteneur="div.ad__info")
+
+# extraction des annonces d'une page de liste des villas
+def extraire_annonces_villas(html, url_page=BASE_URL):
+    annonces = Annonces()
+    for annonce in EXTRACTEUR_LISTE_VILLAS.extraire_tout(html, annonces.rejets):
+        annonce["url_enfant"] = urljoin(url_page, annonce.pop("lien"))
+        annonces.append(annonce)
+    return annonces
+
+# extraction des détails d'une villa à partir de sa page (AnnonceIgnoree si un champ manque)
+def extraire_details_villa(html, annonce):
+    details, motif = EXTRACTEUR_VILLA.analyser(html)
+    if details is None:
+        raise AnnonceIgnoree(motif)
+    details["image lien"] = annonce["image lien"]
+    details["id annonce"] = extraire_id(annonce["url_enfant"])
+    return details
+
+# extraction des annonces d'une page de liste des terrains
+def extraire_annonces_terrains(html, url_page=BASE_URL):
+    annonces = Annonces()
+    for annonce in EXTRACTEUR_LISTE_TERRAINS.extraire_tout(html, annonces.rejets):
+        annonce["url_enfant"] = urljoin(url_page, annonce.pop("lien"))
+        annonces.append(annonce)
+    return annonces
+
+# extraction des détails d'un terrain à partir de sa page
+def extraire_details_terrain(html, annonce):
+    details, motif = EXTRACTEUR_TERRAIN.analyser(html)
+    if details is None:
+        raise AnnonceIgnoree(motif)
+
+    return {
+        "superficie": details["superficie"],
+        "prix": annonce["prix"],
+        "adresse": annonce["adresse"],
+        "img_link": annonce["img_link"],
+        "id annonce": extraire_id(annonce["url_enfant"]),
     }
-    
-    for i in range(nbre_pages):
-    
-        url = 'https://sn.coinafrique.com/categorie/villas?page={n}'
-        
-        res = get(url)
-        soup = bs(res.text, 'html.parser')
-        containers = soup.find_all('div', class_ = "col s6 m4 l3")
-        
-        for container in containers:
-            img_link = container.find('img', class_ = "ad__card-img")['src']
-            inner_link = container.find('a', class_ = "card-image ad__card-image waves-block waves-light")["href"]
-            url_enfant = 'https://sn.coinafrique.com' + inner_link
-            
-            res1 = get(url_enfant)
-            soup1 = bs(res1.text, 'html.parser')
-            container_1 = soup1.find('div', class_ = "card round slide proffer z-depth-0 remove-background-white")
-            try:
-                type_annonce = container_1.find('h1', class_ = 'title title-ad hide-on-large-and-down').text.split()[0].capitalize()
-                nombre_pieces = int(container_1.find('span', class_ = 'qt').text)
-                prix = int(container_1.find('p', class_ = 'price').text.replace('CFA', '').replace(' ', '').strip())
-                adresse = container_1.find_all('span', class_ = 'valign-wrapper')[1].text
-            except Exception as e:
-                continue
-            
-            
-            dico = {
-                "type annonce": type_annonce,
-                "nombre pieces": nombre_pieces,
-                "prix": prix,
-                "adresse": adresse,
-                "image lien": img_link
-            }
-            
-            for key, value in dico.items():
-                data[key].append(value)
-        
-    df = pd.DataFrame(data)
-    return df
+
+# les catégories de coinafrique prises en charge par le scraper
+CATEGORIES = {
+    "villas": {
+        "colonnes": ["type annonce", "nombre pieces", "prix", "adresse", "image lien", "id annonce"],
+        "annonces": extraire_annonces_villas,
+        "details": extraire_details_villa,
+    },
+    "terrains": {
+        "colonnes": ["superficie", "prix", "adresse", "img_link", "id annonce"],
+        "annonces": extraire_annonces_terrains,
+        "details": extraire_details_terrain,
+    },
+}
+
+# compte les annonces écartées d'une page de liste, par motif
+def compter_rejets(mesures, annonces):
+    for motif, nombre in getattr(annonces, "rejets", {}).items():
+        mesures.incrementer("streamdata_annonces_ignorees_total", nombre, motif=motif)
+
+# garde les détails extraits et compte les autres par motif (champ manquant, échec du téléchargement...)
+def trier_details(mesures, categorie, details):
+    lignes = []
+    for ligne in details:
+        if isinstance(ligne, AnnonceIgnoree):
+            mesures.incrementer("streamdata_annonces_ignorees_total", motif=ligne.motif)
+        elif isinstance(ligne, Exception):
+            mesures.incrementer("streamdata_annonces_ignorees_total", motif=f"échec ({type(ligne).__name__})")
+        elif ligne is not None:
+            lignes.append(ligne)
+    mesures.incrementer("streamdata_annonces_extraites_total", len(lignes), categorie=categorie)
+    return lignes
+
+# scrape une page de liste puis toutes ses annonces en parallèle,
+# le parsing est confié à l'étage d'analyse
+async def scraper_page(crawler, analyse, categorie, url):
+    config = CATEGORIES[categorie]
+    try:
+        # les pages de liste changent souvent: elles sont toujours revalidées
+        html = await crawler.fetch(url, ttl=0)
+        annonces = await analyse.analyser(config["annonces"], html, url)
+    except Exception as e:
+        crawler.mesures.incrementer("streamdata_annonces_ignorees_total", motif=f"page de liste en échec ({type(e).__name__})")
+        return []
+    compter_rejets(crawler.mesures, annonces)
+
+    async def scraper_annonce(annonce):
+        page = await crawler.fetch(annonce["url_enfant"])
+        return await analyse.analyser(config["details"], page, annonce)
+
+    details = await asyncio.gather(*(scraper_annonce(annonce) for annonce in annonces), return_exceptions=True)
+    return trier_details(crawler.mesures, categorie, details)
+
+async def scraper_categorie(categorie, nbre_pages, concurrence=8, requetes_par_seconde=4.0, client=None, processus=0, budget=None, ttl=None):
+    urls = [f'{BASE_URL}/categorie/{categorie}?page={i}' for i in range(1, nbre_pages + 1)]
+    async with Crawler(concurrence, requetes_par_seconde, client, budget, ttl=ttl) as crawler, EtageAnalyse(processus) as analyse:
+        pages = await asyncio.gather(*(scraper_page(crawler, analyse, categorie, url) for url in urls))
+
+    lignes = [ligne for page in pages for ligne in page]
+    return pd.DataFrame(lignes, columns=CATEGORIES[categorie]["colonnes"])
+
+# fonction pour scraper les villas
+# client permet par exemple de rejouer un scraping hors ligne:
+# ClientHttp(cache=CacheHttp(hors_ligne=True))
+# processus: nombre de processus d'analyse (0 par défaut: dans le processus courant; None = un par coeur)
+# budget: BudgetCrawl qui borne le nombre de requêtes, les octets ou la durée du scraping
+# requetes_par_seconde: débit de départ, ajusté ensuite selon les réponses du site
+# ttl: âge maximal en secondes des pages d'annonce reprises du cache (0: toujours revalidées)
+def scrap_villas(nbre_pages, concurrence=8, requetes_par_seconde=4.0, client=None, processus=0, budget=None, ttl=None):
+    return asyncio.run(scraper_categorie("villas", nbre_pages, concurrence, requetes_par_seconde, client, processus, budget, ttl))
 
 # fonction pour scraper les terrains
-def scrap_terrains(nbre_page):
-    
-    df1 = pd.DataFrame()
-    
-    for i in range(nbre_page):
-        
-        url = 'https://sn.coinafrique.com/categorie/terrains?page={i}'
-        
-        data = []
-        
-        res = get(url)
-        soup = bs(res.text, 'html.parser')
-        containers = soup.find_all("div",class_ = "col s6 m4 l3")
-        
-        for container in containers:
+def scrap_terrains(nbre_page, concurrence=8, requetes_par_seconde=4.0, client=None, processus=0, budget=None, ttl=None):
+    return asyncio.run(scraper_categorie("terrains", nbre_page, concurrence, requetes_par_seconde, client, processus, budget, ttl))
+
+# API en flux: les annonces d'une page de liste sont renvoyées dès qu'elles sont prêtes,
+# sans attendre la fin du scraping (la boucle asyncio tourne dans un thread dédié)
+def iter_lots(categorie, nbre_pages, concurrence=8, requetes_par_seconde=4.0, client=None, processus=0, taille_file=4, budget=None, ttl=None):
+    urls = [f'{BASE_URL}/categorie/{categorie}?page={i}' for i in range(1, nbre_pages + 1)]
+    file = queue.Queue(maxsize=taille_file)
+    arret = threading.Event()
+    fin = object()
+
+    async def deposer(element):
+        # file bornée: si le consommateur est lent, les téléchargements attendent
+        while not arret.is_set():
+            try:
+                file.put_nowait(element)
+                return
+            except queue.Full:
+                await asyncio.sleep(0.05)
+
+    async def produire():
+        async with Crawler(concurrence, requetes_par_seconde, client, budget, ttl=ttl) as crawler, EtageAnalyse(processus) as analyse:
+            taches = [asyncio.ensure_future(scraper_page(crawler, analyse, categorie, url)) for url in urls]
+            try:
+                for prochaine in asyncio.as_completed(taches):
+                    lot = await prochaine
+                    if lot:
+                        await deposer(lot)
+                    if arret.is_set():
+                        break
+            finally:
+                for tache in taches:
+                    tache.cancel()
+                await asyncio.gather(*taches, return_exceptions=True)
+
+    def executer():
+        try:
+            asyncio.run(produire())
+            resultat = fin
+        except BaseException as e:
+            resultat = e
+        while not arret.is_set():
             try:
-                img_link = container.find("img", class_="ad__card-img")["src"]
-                prix = int(container.find("p", class_="ad__card-price").text.replace(" ", "").replace("CFA", ""))
-                adresse = container.find("p", class_="ad__card-location").text.replace("location_on","")
-                inner_link = container.find("a", class_="card-image ad__card-image waves-block waves-light")["href"]
-                url_enfant = 'https://sn.coinafrique.com' + inner_link
-                
-                resa = get(url_enfant)
-                soup = bs(resa.text, 'html.parser')
-                container__ = soup.find("div", class_="ad__info")
-                superficie = int(container__.find("span", class_="qt").text.replace(" ", "").replace("m2", ""))
-                
-                infos = {
-                    "superficie": superficie,
-                    "prix": prix,
-                    "adresse": adresse,
-                    "img_link": img_link,
-                }
-                
-                data.append(infos)
-            except:
+                file.put(resultat, timeout=0.1)
+                return
+            except queue.Full:
                 pass
-        DF = pd.DataFrame(data)
-        
-        df1 = pd.concat([df1,DF],axis=0).reset_index(drop = True)
 
+    threading.Thread(target=executer, daemon=True).start()
+    try:
+        while True:
+            lot = file.get()
+            if lot is fin:
+                break
+            if isinstance(lot, BaseException):
+                raise lot
+            yield lot
+    finally:
+        arret.set()
+
+def iter_annonces(categorie, nbre_pages, **kwargs):
+    """Renvoie les annonces une par une au fur et à mesure du scraping."""
+    for lot in iter_lots(categorie, nbre_pages, **kwargs):
+        yield from lot
+
+# scraping incrémental: seules les annonces absentes de l'index sont téléchargées,
+# et le crawl s'arrête dès qu'une page de liste ne contient que des annonces connues
+async def scraper_incremental(categorie, nbre_pages, index, concurrence=8, requetes_par_seconde=4.0, client=None, processus=0, budget=None, ecrire=None, ttl=None):
+    config = CATEGORIES[categorie]
+    lots = []
+    boucle = asyncio.get_running_loop()
+
+    async with Crawler(concurrence, requetes_par_seconde, client, budget, ttl=ttl) as crawler, EtageAnalyse(processus) as analyse:
+        # les pages de liste sont lues par lots pour pouvoir s'arrêter tôt
+        for debut in range(1, nbre_pages + 1, concurrence):
+            urls = [f'{BASE_URL}/categorie/{categorie}?page={i}' for i in range(debut, min(debut + concurrence, nbre_pages + 1))]
+            pages = await crawler.fetch_all(urls, ttl=0)
+
+            nouvelles = {}
+            arret = False
+            for url, html in zip(urls, pages):
+                try:
+                    if isinstance(html, Exception):
+                        raise html
+                    annonces = await analyse.analyser(config["annonces"], html, url)
+                except Exception as e:
+                    crawler.mesures.incrementer("streamdata_annonces_ignorees_total", motif=f"page de liste en échec ({type(e).__name__})")
+                    continue
+                compter_rejets(crawler.mesures, annonces)
+                ids = [extraire_id(annonce["url_enfant"]) for annonce in annonces]
+                # sans identifiant, une annonce ne peut pas être dédoublonnée d'un passage à l'autre
+                sans_id = ids.count(None)
+                if sans_id:
+                    crawler.mesures.incrementer("streamdata_annonces_ignorees_total", sans_id, motif="identifiant introuvable")
+                connus = index.connus(categorie, ids)
+                neuves = [(i, a) for i, a in zip(ids, annonces) if i is not None and i not in connus and i not in nouvelles]
+                if len(ids) > sans_id and not neuves:
+                    arret = True
+                    break
+                nouvelles.update(neuves)
+
+            vus = []
+
+            async def scraper_annonce(id_annonce, annonce):
+                page = await crawler.fetch(annonce["url_enfant"])
+                vus.append(id_annonce)
+                return await analyse.analyser(config["details"], page, annonce)
+
+            details = await asyncio.gather(*(scraper_annonce(i, a) for i, a in nouvelles.items()), return_exceptions=True)
+            lot = pd.DataFrame(trier_details(crawler.mesures, categorie, details), columns=config["colonnes"])
+            # le lot est écrit avant d'être marqué vu dans l'index: si l'écriture échoue,
+            # ses annonces seront reprises au prochain passage au lieu d'être perdues
+            if ecrire is not None and not lot.empty:
+                lot = await boucle.run_in_executor(None, ecrire, lot)
+            index.ajouter(categorie, vus)
+            lots.append(lot)
+
+            if arret:
+                break
+
+    lots = [lot for lot in lots if not lot.empty]
+    return pd.concat(lots, ignore_index=True) if lots else pd.DataFrame(columns=config["colonnes"])
+
+# scrape uniquement les nouvelles annonces d'une catégorie et les ajoute au fichier (csv ou parquet),
+# lot par lot
+def scrap_incremental(categorie, nbre_pages, csv_path, concurrence=8, requetes_par_seconde=4.0, client=None, processus=0, index=None, budget=None, vignettes=None, ttl=None):
+    index = index or IndexAnnonces()
+
+    def ecrire(lot):
+        if vignettes is not None:
+            lot = vignettes.completer(lot)
+        ajouter(csv_path, lot)
+        return lot
+
+    return asyncio.run(scraper_incremental(categorie, nbre_pages, index, concurrence, requetes_par_seconde, client, processus, budget, ecrire, ttl))
 
-    return df1
+# scrape une catégorie vers un fichier (csv ou parquet), utilisé par les tâches et la ligne de commande;
+# renvoie le nombre de lignes écrites et, en incrémental, le dataframe des nouvelles annonces.
+# avec un magasin de vignettes, les images de chaque lot sont téléchargées avant son écriture
+def scraper_fichier(categorie, nbre_pages, chemin, incremental=False, progression=None, vignettes=None, **options):
+    if incremental:
+        nouvelles = scrap_incremental(categorie, nbre_pages, chemin, vignettes=vignettes, **options)
+        return len(nouvelles), nouvelles
+    lignes = 0
+    colonnes = CATEGORIES[categorie]["colonnes"] + (["vignette"] if vignettes is not None else [])
+    with ouvrir_sortie(chemin, colonnes) as sortie:
+        for lot in iter_lots(categorie, nbre_pages, **options):
+            if vignettes is not None:
+                lot = vignettes.completer(lot)
+            sortie.ecrire(lot)
+            lignes += len(lot)
+            if progression is not None:
+                progression(lignes)
+    return lignes, None
 
 # variable pour les formulaires
 google_forms = '<iframe src="https://docs.google.com/forms/d/e/1FAIpQLScIINigJlApa3cAGiSv4cmZMRUvjxyms6HmKoIdOQcrEeuSvA/viewform?embedded=true" width="700" height="650" frameborder="0" marginheight="0" marginwidth="0">Chargement…</iframe>'
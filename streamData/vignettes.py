@@ -0,0 +1,185 @@
+import asyncio
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+import pandas as pd
+
+from cache_http import DOSSIER_CACHE
+from client_http import client_partage
+from mesures import mesures_globales
+from moteur_crawl import Crawler
+
+# Pillow est optionnel (il vient avec streamlit): sans lui les images sont gardées telles quelles
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+COLONNES_IMAGE = ("image lien", "img_link")
+COLONNE_VIGNETTE = "vignette"
+
+COTE = 256
+TAILLE_MAX = 500 * 1024 * 1024
+# l'éviction descend sous ce seuil pour ne pas évincer à chaque nouvelle image
+MARGE_EVICTION = 0.9
+
+
+def colonne_image(colonnes):
+    return next((colonne for colonne in colonnes if str(colonne).lower() in COLONNES_IMAGE), None)
+
+
+def reduire(contenu, cote=COTE):
+    """Vignette webp d'au plus `cote` pixels de côté; (contenu, extension)."""
+    if Image is None:
+        return contenu, None
+    with Image.open(io.BytesIO(contenu)) as image:
+        image.thumbnail((cote, cote))
+        sortie = io.BytesIO()
+        image.convert("RGB").save(sortie, format="WEBP", quality=80)
+    return sortie.getvalue(), ".webp"
+
+
+# magasin de vignettes adressé par contenu: chaque fichier est nommé d'après le sha256 de ses
+# octets (deux URL de la même image partagent le fichier), un index sqlite relie les URL aux
+# fichiers et garde la date du dernier accès; au-delà de taille_max les moins récents sont évincés;
+# les images passent par le crawler: même débit adaptatif par hôte et mêmes reprises que les pages
+class MagasinVignettes:
+    def __init__(self, dossier=os.path.join(DOSSIER_CACHE, "vignettes"), taille_max=TAILLE_MAX, cote=COTE,
+                 concurrence=16, requetes_par_seconde=8.0, client=None):
+        self.dossier = dossier
+        self.taille_max = taille_max
+        self.cote = cote
+        self.concurrence = concurrence
+        self.requetes_par_seconde = requetes_par_seconde
+        self.client = client or client_partage()
+        self.verrou = threading.Lock()
+        os.makedirs(dossier, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(dossier, "index.sqlite"), check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS images (url TEXT PRIMARY KEY, empreinte TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS fichiers (
+                empreinte TEXT PRIMARY KEY,
+                chemin TEXT NOT NULL,
+                taille INTEGER NOT NULL,
+                dernier_acces REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS images_par_empreinte ON images (empreinte);
+            CREATE INDEX IF NOT EXISTS fichiers_par_acces ON fichiers (dernier_acces);
+        """)
+        self.conn.commit()
+
+    def _connus(self, urls):
+        """Chemins déjà présents pour ces URL (et encore sur disque); l'accès est daté pour l'éviction."""
+        connus = {}
+        with self.verrou:
+            for debut in range(0, len(urls), 500):
+                morceau = urls[debut:debut + 500]
+                lignes = self.conn.execute(
+                    f"SELECT i.url, f.empreinte, f.chemin FROM images i JOIN fichiers f ON f.empreinte = i.empreinte "
+                    f"WHERE i.url IN ({', '.join('?' * len(morceau))})", morceau
+                ).fetchall()
+                connus.update({url: (empreinte, chemin) for url, empreinte, chemin in lignes if os.path.exists(chemin)})
+            self.conn.executemany("UPDATE fichiers SET dernier_acces = ? WHERE empreinte = ?",
+                                  [(time.time(), empreinte) for empreinte, _ in connus.values()])
+            self.conn.commit()
+        return {url: chemin for url, (_, chemin) in connus.items()}
+
+    def _enregistrer(self, url, contenu):
+        """Réduit une image téléchargée et l'ajoute au magasin; renvoie le chemin de la vignette."""
+        contenu, extension = reduire(contenu, self.cote)
+        empreinte = hashlib.sha256(contenu).hexdigest()
+        extension = extension or os.path.splitext(urlparse(url).path)[1].lower() or ".img"
+        chemin = os.path.join(self.dossier, empreinte[:2], empreinte + extension)
+        if not os.path.exists(chemin):
+            os.makedirs(os.path.dirname(chemin), exist_ok=True)
+            partiel = f"{chemin}.{threading.get_ident()}.part"
+            with open(partiel, "wb") as f:
+                f.write(contenu)
+            os.replace(partiel, chemin)
+        with self.verrou:
+            self.conn.execute("INSERT OR REPLACE INTO fichiers VALUES (?, ?, ?, ?)", (empreinte, chemin, len(contenu), time.time()))
+            self.conn.execute("INSERT OR REPLACE INTO images VALUES (?, ?)", (url, empreinte))
+            self.conn.commit()
+        return chemin
+
+    async def _telecharger(self, crawler, url):
+        hote = urlparse(url).netloc
+        try:
+            contenu = await crawler.fetch_octets(url)
+            # la réduction (Pillow) et l'écriture sur disque ne bloquent pas la boucle
+            chemin = await asyncio.get_running_loop().run_in_executor(crawler.executor, self._enregistrer, url, contenu)
+        except Exception as e:
+            statut = getattr(getattr(e, "response", None), "status_code", None) or type(e).__name__
+            mesures_globales().incrementer("streamdata_images_total", hote=hote, statut=statut)
+            return url, None
+        mesures_globales().incrementer("streamdata_images_total", hote=hote, statut="ok")
+        return url, chemin
+
+    async def _telecharger_tout(self, urls):
+        async with Crawler(self.concurrence, self.requetes_par_seconde, self.client) as crawler:
+            return await asyncio.gather(*(self._telecharger(crawler, url) for url in urls))
+
+    def chemins(self, urls):
+        """Chemin local de la vignette de chaque URL (None si l'image n'a pas pu être récupérée);
+        chaque URL distincte est téléchargée au plus une fois, en parallèle et au débit de l'hôte."""
+        distinctes = list(dict.fromkeys(url for url in urls if isinstance(url, str) and url.startswith(("http://", "https://"))))
+        trouves = self._connus(distinctes)
+        manquantes = [url for url in distinctes if url not in trouves]
+        if manquantes:
+            trouves.update(asyncio.run(self._telecharger_tout(manquantes)))
+            self.evincer(proteger=set(trouves.values()))
+        return [trouves.get(url) for url in urls]
+
+    def completer(self, lignes, colonne=None):
+        """Ajoute la colonne « vignette » à un lot d'annonces (liste de dictionnaires) ou à un dataframe."""
+        if isinstance(lignes, pd.DataFrame):
+            colonne = colonne or colonne_image(lignes.columns)
+            if colonne is None:
+                return lignes
+            return lignes.assign(**{COLONNE_VIGNETTE: self.chemins(lignes[colonne].tolist())})
+        colonne = colonne or (colonne_image(lignes[0]) if lignes else None)
+        if colonne is None:
+            return lignes
+        for ligne, chemin in zip(lignes, self.chemins([ligne.get(colonne) for ligne in lignes])):
+            # chaîne vide plutôt que None: le schéma parquet est fixé par le premier lot
+            ligne[COLONNE_VIGNETTE] = chemin or ""
+        return lignes
+
+    def evincer(self, proteger=()):
+        """Supprime les vignettes les moins récemment utilisées tant que le magasin dépasse sa taille
+        (sauf celles de `proteger`, que l'appelant s'apprête à renvoyer)."""
+        with self.verrou:
+            total = self.conn.execute("SELECT COALESCE(SUM(taille), 0) FROM fichiers").fetchone()[0]
+            if total <= self.taille_max:
+                return 0
+            evincees = []
+            for empreinte, chemin, taille in self.conn.execute(
+                "SELECT empreinte, chemin, taille FROM fichiers ORDER BY dernier_acces"
+            ).fetchall():
+                if total <= self.taille_max * MARGE_EVICTION:
+                    break
+                if chemin in proteger:
+                    continue
+                evincees.append((empreinte,))
+                total -= taille
+                if os.path.exists(chemin):
+                    os.remove(chemin)
+            self.conn.executemany("DELETE FROM images WHERE empreinte = ?", evincees)
+            self.conn.executemany("DELETE FROM fichiers WHERE empreinte = ?", evincees)
+            self.conn.commit()
+        return len(evincees)
+
+    def resume(self):
+        with self.verrou:
+            fichiers, octets = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(taille), 0) FROM fichiers").fetchone()
+            urls = self.conn.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+        return {"fichiers": fichiers, "octets": octets, "urls": urls}
+
+    def close(self):
+        with self.verrou:
+            self.conn.close()